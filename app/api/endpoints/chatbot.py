@@ -1,36 +1,178 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
-from app.services.knowledge_base import KnowledgeBase
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List
+from datetime import date, datetime
+import time
+from app.services.knowledge_base import knowledge_base
 from app.services.state_manager import StateManager, ConversationState, StateContext
+from app.services.conversation_log import conversation_log
+from app.services.call_analysis_pipeline import call_analysis_pipeline
+from app.services.admission_control import admission_controller, AdmissionRejected
+from app.services.session_locks import session_locks
+from app.services.profiling import mark
+from app.services.availability import availability_index, time_to_slot, slot_to_time, SLOT_MINUTES, TIME_PATTERN
 from app.core.config import settings # Import settings to access city list
+from app.utils.responses import negotiated_response
+from app.utils.helpers import parse_availability_request
 
 router = APIRouter()
-kb = KnowledgeBase()
+kb = knowledge_base  # Shared with the knowledge base API, so uploads reach the chat flow
 state_manager = StateManager()
 
 class ChatRequest(BaseModel):
     message: str
     session_id: str
     current_state: Optional[str] = None # Accept current state from frontend
+    turn_id: Optional[str] = None # Client-generated id for this turn, resent unchanged on retries
 
 class ChatResponse(BaseModel):
     response: str
     state: str
     options: Optional[Dict[str, Any]] = None
 
+class ReserveRequest(BaseModel):
+    outlet: str
+    date: date
+    time: str = Field(pattern=TIME_PATTERN)
+    party_size: int = Field(gt=0)
+
+# Option payloads are built once at import and shared by every response; never mutate them
+CITY_OPTIONS = {"cities": list(settings.CITIES.keys())}
+NEXT_ACTIONS = ["Menu", "Book Table", "FAQs"]
+LOCATION_OPTIONS = {
+    city: {"locations": locations, "next_actions": NEXT_ACTIONS}
+    for city, locations in settings.CITIES.items()
+}
+NO_LOCATION_OPTIONS = {"locations": [], "next_actions": NEXT_ACTIONS}
+QUERY_TYPE_OPTIONS = {"query_types": ["FAQs", "Booking"]}
+BOOKING_FIELD_OPTIONS = {"booking_fields": ["name", "date", "time", "guests"]}
+CONFIRMATION_OPTIONS = {"confirmation": ["yes", "no"]}
+
+# Alternatives are offered within this many minutes either side of the requested time
+ALTERNATIVE_WINDOW_MINUTES = 60
+ALTERNATIVES_SHOWN = 5
+SLOTS_SHOWN = 4
+
 # In-memory session storage (replace with proper database in production)
 sessions: Dict[str, StateContext] = {}
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request = None):
+    # Phase marks feed the timing breakdown of slow requests
+    mark("parse")
+    client_id = _client_id(http_request)
+    # A retried turn gets the response it already had instead of advancing the state again;
+    # answering from the cache costs nothing, so it skips admission control
+    result = _cached_reply(request)
+    try:
+        if result is None:
+            # Turns for one session run one at a time, in arrival order: queue for the session
+            # now, since admission checks run in worker threads and can finish in any order
+            turn = session_locks.ticket(request.session_id)
+            try:
+                async with admission_controller.admit(client_id, request.session_id):
+                    mark("admission")
+                    async with turn:
+                        mark("session_lock")
+                        # Check again: the original may have finished while this retry waited
+                        result = _cached_reply(request)
+                        if result is None:
+                            result = await _record_turn(request)
+                            if request.turn_id:
+                                sessions[request.session_id].replies.put(request.turn_id, request.message, result)
+            finally:
+                turn.close()
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    if http_request is None:
+        # In-process callers (e.g. replay) get the model itself
+        return result
+    # Encode directly instead of re-validating through response_model
+    return negotiated_response(http_request, {
+        "response": result.response,
+        "state": result.state,
+        "options": result.options,
+    })
+
+def _initial_state(request: ChatRequest) -> ConversationState:
+    """State for a new session: the one the frontend sent, if valid, otherwise the greeting"""
+    if request.current_state in ConversationState.__members__.values():
+        return ConversationState(request.current_state)
+    return ConversationState.INITIAL_GREETING
+
+def _client_id(http_request: Optional[Request]) -> str:
+    """The caller's address for rate limiting, taken from the proxy header when one is configured"""
+    if http_request is None:
+        return "unknown"
+    if settings.CLIENT_IP_HEADER:
+        forwarded = http_request.headers.get(settings.CLIENT_IP_HEADER, "")
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if hops:
+            # Entries left of those our own proxies appended are client-controlled
+            return hops[-min(max(settings.TRUSTED_PROXY_HOPS, 1), len(hops))]
+    return http_request.client.host if http_request.client else "unknown"
+
+def _cached_reply(request: ChatRequest) -> Optional[ChatResponse]:
+    """The response already given to this turn_id in this session, if it is still cached"""
+    context = sessions.get(request.session_id) if request.turn_id else None
+    cached = context.replies.get(request.turn_id) if context else None
+    if cached is None:
+        return None
+    message, response = cached
+    if message != request.message:
+        raise HTTPException(status_code=409, detail=f"turn_id {request.turn_id} was already used for a different message")
+    return response
+
+async def _record_turn(request: ChatRequest) -> ChatResponse:
+    context = sessions.get(request.session_id)
+    # A new session starts this turn in its initial state
+    state_before = (context.current_state if context else _initial_state(request)).value
+    answers_before = context.answers_given if context else 0
+    started = time.perf_counter()
+    result = None
+    error = None
+    try:
+        result = await _run_turn(request)
+        return result
+    except HTTPException as e:
+        error = e.detail
+        raise
+    finally:
+        mark("state_machine")
+        # Capture every turn, successful or not, for replay and post-call analysis
+        context = sessions.get(request.session_id)
+        turn = {
+            "session_id": request.session_id,
+            "timestamp": datetime.now().isoformat(),
+            "requested_state": request.current_state,
+            "state_before": state_before,
+            "state_after": context.current_state.value if context else None,
+            "query_type": context.query_type if context else None,
+            "answered": bool(context and context.answers_given > answers_before),
+            "message": request.message,
+            "response": result.response if result else None,
+            "options": result.options if result else None,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+            "error": error,
+        }
+        conversation_log.record(turn)
+        call_analysis_pipeline.observe(turn)
+        mark("capture")
+
+async def _run_turn(request: ChatRequest) -> ChatResponse:
+    # Last good state of the session, restored if this turn fails part-way
+    last_good = sessions.get(request.session_id)
+    snapshot = last_good.model_copy(deep=True) if last_good else None
     try:
         # Get or create session context
         context = sessions.get(request.session_id)
         if not context:
             # Use state from frontend if available and valid, otherwise default to initial
-            initial_state = ConversationState(request.current_state) if request.current_state in ConversationState.__members__.values() else ConversationState.INITIAL_GREETING
-            context = StateContext(current_state=initial_state)
+            context = StateContext(current_state=_initial_state(request))
             sessions[request.session_id] = context
         else:
             # Update context with the state from the frontend if provided and valid
@@ -50,7 +192,7 @@ async def chat(request: ChatRequest):
             # Any input after initial greeting moves to city selection
             next_state = ConversationState.CITY_SELECTION
             response = "Welcome to Barbeque Nation! How can I help you today? Please select your city."
-            options = {"cities": list(settings.CITIES.keys())} # Use city names from settings
+            options = CITY_OPTIONS # Use city names from settings
 
         elif context.current_state == ConversationState.CITY_SELECTION:
             # After city selection, validate and capture the city, then move to restaurant selection
@@ -63,10 +205,10 @@ async def chat(request: ChatRequest):
             else:
                  # Stay in CITY_SELECTION if city is invalid and ask again
                  response = f"Sorry, I don't recognize that city. Please select a city from the options."
-                 options = {"cities": list(settings.CITIES.keys())}
+                 options = CITY_OPTIONS
                  # next_state remains CITY_SELECTION, response and options set above
                  context.current_state = next_state # Update state for response generation
-                 return ChatResponse(
+                 return ChatResponse.model_construct(
                      response=response,
                      state=context.current_state.value,
                      options=options
@@ -76,8 +218,9 @@ async def chat(request: ChatRequest):
              # Handle input after listing locations and actions.
              # Check if user input matches a location or a next action (Menu, Book, FAQ)
              recognized_input = user_input.lower()
-             locations = settings.CITIES.get(context.city, [])
+             locations = settings.CITIES.get((context.city or "").lower(), [])
              location_names_lower = [loc.lower() for loc in locations]
+             availability_query = parse_availability_request(request.message)
 
              if recognized_input in location_names_lower:
                   # User selected a location
@@ -106,13 +249,21 @@ async def chat(request: ChatRequest):
                   next_state = ConversationState.QUERY_TYPE # Move to query type
                    # Response will be generated in the next block
 
+             elif any(availability_query.values()):
+                  # No explicit action, but a date, time or party size means "who has a table",
+                  # possibly for a named outlet
+                  context.booking_details = {**(context.booking_details or {}), **{
+                      field: str(value) for field, value in availability_query.items() if value
+                  }}
+                  return _availability_reply(context, recognized_input, availability_query)
+
              else:
                   # Input not recognized in this state, repeat the prompt
                   response = "I didn't understand that. Please select a location or one of the actions (Menu, Book Table, FAQs)."
-                  options = {"locations": locations, "next_actions": ["Menu", "Book Table", "FAQs"]}
+                  options = LOCATION_OPTIONS.get((context.city or "").lower(), NO_LOCATION_OPTIONS)
                   # next_state remains RESTAURANT_SELECTION, response and options set above
                   context.current_state = next_state # Update state for response generation
-                  return ChatResponse(
+                  return ChatResponse.model_construct(
                      response=response,
                      state=context.current_state.value,
                      options=options
@@ -128,24 +279,24 @@ async def chat(request: ChatRequest):
              # and immediately transition to CITY_SELECTION as handled above.
              # A fallback response if somehow we stay here:
             response = "Welcome to Barbeque Nation! How can I help you today? Please select your city."
-            options = {"cities": list(settings.CITIES.keys())} 
+            options = CITY_OPTIONS 
 
         elif context.current_state == ConversationState.CITY_SELECTION:
             # We transitioned into this state, ask for the city.
             response = "Please select a city (Delhi or Bangalore):"
-            options = {"cities": list(settings.CITIES.keys())} 
+            options = CITY_OPTIONS 
 
         elif context.current_state == ConversationState.RESTAURANT_SELECTION:
             # We transitioned into this state after capturing the city.
             # List the locations for the captured city and available actions.
-            locations = settings.CITIES.get(context.city, []) # Get locations from settings
+            locations = settings.CITIES.get((context.city or "").lower(), []) # Get locations from settings
             if locations:
-                 response = f"Here are the locations in {context.city}:\n" + "\n".join([f"- {loc}" for loc in locations]) + "\n\nPlease select a location or tell me what you'd like to do (e.g., view menu, book a table, FAQs)."
-                 options = {"locations": locations, "next_actions": ["Menu", "Book Table", "FAQs"]}
+                 response = f"Here are the locations in {context.city}:\n" + "\n".join([f"- {loc}" for loc in locations]) + "\n\nPlease select a location, ask for a table (e.g., a table for 4 tomorrow at 8pm) or tell me what you'd like to do (e.g., view menu, book a table, FAQs)."
+                 options = LOCATION_OPTIONS.get((context.city or "").lower(), NO_LOCATION_OPTIONS)
             else:
                  # Fallback if no locations found (shouldn't happen with valid city)
                  response = f"Sorry, no locations found for {context.city}. Please select another city."
-                 options = {"cities": list(settings.CITIES.keys())}
+                 options = CITY_OPTIONS
 
         elif context.current_state == ConversationState.QUERY_TYPE:
             # Handle queries about Menu, FAQs, or Location Info
@@ -153,6 +304,7 @@ async def chat(request: ChatRequest):
                 # Fetch and display Menu
                 menu_items = kb.get_menu(context.restaurant)
                 if menu_items:
+                    context.answers_given += 1
                     response = f"Here is the menu for {context.restaurant}:\n" + "\n".join(menu_items)
                     options = None # Or options to go back or ask something else
                 else:
@@ -160,10 +312,15 @@ async def chat(request: ChatRequest):
                     options = None
 
             elif context.query_type == "FAQs":
-                # Fetch and display FAQs
+                # Answer the caller's question if it matches an FAQ, otherwise list the questions
                 faqs = kb.get_faqs(context.restaurant)
-                if faqs:
-                    response = f"Here are some FAQs for {context.restaurant}:\n" + "\n".join(faqs)
+                match = kb.search_faq(context.restaurant, request.message) if "faq" not in user_input else None
+                if match:
+                    context.answers_given += 1
+                    response = match["answer"]
+                    options = None
+                elif faqs:
+                    response = f"Here are some FAQs for {context.restaurant}:\n" + "\n".join(f"- {faq['question']}" for faq in faqs) + "\n\nAsk me any question and I'll find the answer."
                     options = None # Or options to ask another FAQ or go back
                 else:
                     response = f"Sorry, I couldn't find FAQs for {context.restaurant}."
@@ -172,22 +329,22 @@ async def chat(request: ChatRequest):
             elif context.query_type == "Location_Info":
                  # Handle general query after location selection (simplified)
                  response = f"You've selected a location in {context.city}. What specific information are you looking for about this location?"
-                 options = {"query_types": ["FAQs", "Booking"]} # Offer next steps
+                 options = QUERY_TYPE_OPTIONS # Offer next steps
 
             else:
                 # Fallback for unrecognized query type in this state
                 response = "What would you like to know? (1 for FAQs, 2 for Booking)"
-                options = {"query_types": ["FAQs", "Booking"]}
+                options = QUERY_TYPE_OPTIONS
 
         elif context.current_state == ConversationState.BOOKING_COLLECTION:
             response = "Please provide your booking details (name, date, time, guests)"
-            options = {"booking_fields": ["name", "date", "time", "guests"]}
+            options = BOOKING_FIELD_OPTIONS
             # Add logic here to capture booking details and transition to BOOKING_CONFIRMATION
 
         elif context.current_state == ConversationState.BOOKING_CONFIRMATION:
              # In a real app, process booking details and ask for confirmation
              response = "Would you like to confirm your booking? (yes/no)"
-             options = {"confirmation": ["yes", "no"]}
+             options = CONFIRMATION_OPTIONS
             # Add logic here to transition to FAREWELL or back to booking collection
 
         elif context.current_state == ConversationState.FAREWELL:
@@ -205,7 +362,7 @@ async def chat(request: ChatRequest):
         # Update session context with the final state for this turn
         sessions[request.session_id] = context
 
-        return ChatResponse(
+        return ChatResponse.model_construct(
             response=response,
             state=context.current_state.value, # Return the new state
             options=options
@@ -213,11 +370,89 @@ async def chat(request: ChatRequest):
         
     except Exception as e:
         print(f"Error in chatbot endpoint: {e}") # Log the error on the backend
-        # Reset state on major error to allow restarting
-        if request.session_id in sessions:
-             del sessions[request.session_id]
+        # Roll back to the state before this turn so the conversation survives one bad turn
+        if snapshot is not None:
+            sessions[request.session_id] = snapshot
+        else:
+            sessions.pop(request.session_id, None)
         raise HTTPException(status_code=500, detail="Sorry, there was an error processing your request. Please try again.")
 
+def _nearest_slots(slots: List[str], requested: Optional[int]) -> List[str]:
+    """The SLOTS_SHOWN slots closest to the requested one (the earliest without one), in time order"""
+    if requested is None:
+        return slots[:SLOTS_SHOWN]
+    return sorted(sorted(slots, key=lambda label: (abs(time_to_slot(label) - requested), label))[:SLOTS_SHOWN])
+
+def _availability_reply(context: StateContext, user_input: str, query: Dict[str, Any]) -> ChatResponse:
+    """Offer the outlets in the caller's city with a table near the requested time"""
+    city_key = (context.city or "").lower()
+    day = query["date"] or date.today()
+    guests = query["guests"] or 2
+    # The slot a sitting at the requested time starts in; times off the 15-minute grid round down
+    requested = time_to_slot(query["time"]) if query["time"] else None
+    if requested is not None:
+        minutes = requested * SLOT_MINUTES
+        window_start = slot_to_time(max(minutes - ALTERNATIVE_WINDOW_MINUTES, 0) // SLOT_MINUTES)
+        window_end = slot_to_time(min(minutes + ALTERNATIVE_WINDOW_MINUTES + SLOT_MINUTES, 24 * 60 - 1) // SLOT_MINUTES)
+    else:
+        window_start, window_end = settings.OUTLET_OPEN_TIME, settings.OUTLET_CLOSE_TIME
+
+    named = next((loc for loc in settings.CITIES.get(city_key, []) if loc.lower() in user_input), None)
+    # Decode only as many outlets as are offered; the named one is looked up on its own
+    available = availability_index.search(
+        city_key, day, guests, window_start, window_end, limit=ALTERNATIVES_SHOWN + (1 if named else 0)
+    )
+    when = f"on {day.strftime('%A, %d %B')}" + (f" at {query['time']}" if query["time"] else "")
+    lines = []
+    if named:
+        slots = availability_index.outlet_slots(named, day, guests, window_start, window_end)
+        if (slot_to_time(requested) in slots) if requested is not None else slots:
+            lines.append(f"Good news, {named} has a table for {guests} {when}.")
+        else:
+            lines.append(f"Sorry, {named} is full for {guests} {when}.")
+        available = [outlet for outlet in available if outlet["outlet"] != named][:ALTERNATIVES_SHOWN]
+    if available:
+        lines.append(f"{'Other outlets' if named else 'Outlets'} in {context.city} with a table for {guests}:")
+        lines.extend(
+            f"- {outlet['outlet']}: {', '.join(_nearest_slots(outlet['slots'], requested))}"
+            for outlet in available
+        )
+        lines.append("\nPlease select a location or tell me what you'd like to do (e.g., book a table).")
+        options = {"locations": [outlet["outlet"] for outlet in available], "next_actions": NEXT_ACTIONS}
+    else:
+        if not named:
+            lines.append(f"Sorry, no outlet in {context.city} has a table for {guests} {when}.")
+        lines.append("Would you like to try another day or time?")
+        options = LOCATION_OPTIONS.get(city_key, NO_LOCATION_OPTIONS)
+    return ChatResponse.model_construct(response="\n".join(lines), state=context.current_state.value, options=options)
+
+@router.get("/availability")
+async def search_availability(city: str, date: date, http_request: Request, party_size: int = Query(gt=0),
+                              start: Optional[str] = None, end: Optional[str] = None, limit: int = 50):
+    if city.lower() not in settings.CITIES:
+        raise HTTPException(status_code=404, detail=f"No restaurants found in {city}")
+    try:
+        outlets = availability_index.search(
+            city, date, party_size, start or settings.OUTLET_OPEN_TIME, end or settings.OUTLET_CLOSE_TIME, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=422, detail="start and end must be HH:MM times")
+    return negotiated_response(http_request, {"outlets": outlets})
+
+@router.post("/availability/reserve")
+async def reserve_table(reservation: ReserveRequest):
+    try:
+        table_size = availability_index.reserve(
+            reservation.outlet, reservation.date, reservation.time, reservation.party_size
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Outlet {reservation.outlet} not found")
+    except ValueError:
+        raise HTTPException(status_code=422, detail="time must be an HH:MM time")
+    if table_size is None:
+        raise HTTPException(status_code=409, detail=f"No table for {reservation.party_size} at {reservation.outlet} then")
+    return {"outlet": reservation.outlet, "date": reservation.date, "time": reservation.time, "table_size": table_size}
+
 @router.get("/restaurants/{city}")
 async def get_restaurants(city: str):
     restaurants = kb.get_restaurants_by_city(city)
@@ -226,28 +461,28 @@ async def get_restaurants(city: str):
     return {"restaurants": restaurants}
 
 @router.get("/restaurant/{restaurant_name}")
-async def get_restaurant_info(restaurant_name: str):
+async def get_restaurant_info(restaurant_name: str, http_request: Request):
     info = kb.get_restaurant_info(restaurant_name)
     if not info:
         raise HTTPException(status_code=404, detail=f"Restaurant {restaurant_name} not found")
-    return info
+    return negotiated_response(http_request, info)
 
 @router.get("/restaurant/{restaurant_name}/menu")
-async def get_restaurant_menu(restaurant_name: str):
+async def get_restaurant_menu(restaurant_name: str, http_request: Request):
     menu = kb.get_menu(restaurant_name)
     if not menu:
         raise HTTPException(status_code=404, detail=f"Menu not found for {restaurant_name}")
-    return {"menu": menu}
+    return negotiated_response(http_request, {"menu": menu})
 
 @router.get("/restaurant/{restaurant_name}/faq")
-async def get_restaurant_faq(restaurant_name: str, query: Optional[str] = None):
+async def get_restaurant_faq(restaurant_name: str, http_request: Request, query: Optional[str] = None):
     if query:
         result = kb.search_faq(restaurant_name, query)
         if not result:
             raise HTTPException(status_code=404, detail=f"No FAQ found matching '{query}'")
-        return {"faq": result}
+        return negotiated_response(http_request, {"faq": result})
     else:
-        faq = kb.get_faq(restaurant_name)
+        faq = kb.get_faqs(restaurant_name)
         if not faq:
             raise HTTPException(status_code=404, detail=f"FAQ not found for {restaurant_name}")
-        return {"faq": faq} 
\ No newline at end of file
+        return negotiated_response(http_request, {"faq": faq}) 
\ No newline at end of file
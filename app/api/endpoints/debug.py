@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import asyncio
+import secrets
+from app.core.config import settings
+from app.services.profiling import sampling_profiler, slow_request_log, ProfilerBusy
+
+def require_admin(x_admin_key: Optional[str] = Header(None)):
+    if not settings.ADMIN_API_KEY:
+        # Debug surface switched off entirely
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=403, detail="Admin key required")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile(seconds: float = 10.0, interval_ms: Optional[float] = None):
+    """Sample every thread for `seconds` and return collapsed stacks for a flamegraph"""
+    if not 0 < seconds <= settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=422, detail=f"seconds must be between 0 and {settings.PROFILER_MAX_SECONDS}")
+    if interval_ms is None:
+        interval_ms = settings.PROFILER_INTERVAL_MS
+    elif not interval_ms >= settings.PROFILER_MIN_INTERVAL_MS:
+        # Below this the sampler busy-spins; negative values would make time.sleep raise
+        raise HTTPException(status_code=422, detail=f"interval_ms must be at least {settings.PROFILER_MIN_INTERVAL_MS}")
+    interval = interval_ms / 1000
+    try:
+        # Sample from a worker thread so the event loop keeps serving (and being profiled)
+        stacks = await asyncio.to_thread(sampling_profiler.profile, seconds, interval)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return PlainTextResponse(sampling_profiler.format_collapsed(stacks))
+
+@router.get("/slow-requests")
+async def get_slow_requests(limit: Optional[int] = None):
+    """Recent requests slower than SLOW_REQUEST_THRESHOLD_MS, newest first, with their phase breakdown"""
+    return {
+        "threshold_ms": slow_request_log.threshold_ms,
+        "captured": slow_request_log.captured,
+        "requests": slow_request_log.recent(limit),
+    }
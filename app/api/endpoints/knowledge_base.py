@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Request
 from typing import List, Optional
 from app.services.knowledge_base import knowledge_base
 import os
 from app.core.config import settings
+from app.utils.responses import negotiated_response
 
 router = APIRouter()
 
@@ -67,13 +68,18 @@ async def search_knowledge_base(query: str):
     
     return {"results": results}
 
+@router.get("/changes")
+async def get_changes(http_request: Request, since: int = 0, generation: Optional[str] = None):
+    """Documents added, changed or removed after a knowledge base version, for incremental sync"""
+    return negotiated_response(http_request, knowledge_base.changes(since, generation))
+
 @router.get("/restaurant/{restaurant_name}/info")
-async def get_restaurant_info(restaurant_name: str):
+async def get_restaurant_info(restaurant_name: str, http_request: Request):
     """Get all information about a specific restaurant"""
     info = knowledge_base.get_restaurant_info(restaurant_name)
     if not info:
         raise HTTPException(status_code=404, detail=f"Restaurant {restaurant_name} not found")
-    return info
+    return negotiated_response(http_request, info)
 
 @router.get("/restaurant/{restaurant_name}/timings")
 async def get_restaurant_timings(restaurant_name: str):
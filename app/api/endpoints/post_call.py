@@ -1,32 +1,30 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import List, Optional
 from datetime import datetime
+import asyncio
 import json
 import os
 from app.core.config import settings
+from app.services.pending_actions import pending_action_queue
+from app.services.funnel_analytics import funnel_analytics
+from app.services.call_analysis import CallAnalysis, call_analyses, store_call_analysis
 
 router = APIRouter()
 
-class CallAnalysis(BaseModel):
-    session_id: str
-    start_time: datetime
-    end_time: datetime
-    duration: float
-    user_satisfaction: Optional[int]
-    intent_fulfilled: bool
-    conversation_flow: List[Dict]
-    error_count: int
-    resolution_status: str
-    pending_actions: Optional[List[str]]
+class ClaimRequest(BaseModel):
+    owner: str
+    action_type: Optional[str] = None
+    action_id: Optional[int] = None
+    lease_seconds: Optional[float] = None
 
-# In-memory storage for call analysis (replace with database in production)
-call_analyses: Dict[str, CallAnalysis] = {}
+class AckRequest(BaseModel):
+    owner: str
 
 @router.post("/analyze")
 async def analyze_call(analysis: CallAnalysis):
     """Store call analysis data"""
-    call_analyses[analysis.session_id] = analysis
+    store_call_analysis(analysis)
     return {"message": "Call analysis stored successfully"}
 
 @router.get("/analysis/{session_id}")
@@ -103,15 +101,70 @@ async def get_metrics():
         "error_rate": total_errors / total_calls if total_calls > 0 else 0
     }
 
+@router.get("/funnel")
+async def get_conversation_funnel(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    top_paths: int = 10
+):
+    """Transition matrix, drop-off funnel, dwell times and most common paths across conversation flows"""
+    # Snapshot on the event loop, then crunch the arrays in a worker thread
+    snapshot = funnel_analytics.snapshot()
+    return await asyncio.to_thread(
+        funnel_analytics.compute,
+        start_date=start_date,
+        end_date=end_date,
+        top_paths=min(max(top_paths, 1), 100),
+        snapshot=snapshot,
+    )
+
 @router.get("/pending-actions")
-async def get_pending_actions():
-    """Get all pending actions from call analyses"""
-    pending_actions = []
-    for analysis in call_analyses.values():
-        if analysis.pending_actions:
-            pending_actions.extend(analysis.pending_actions)
-    
-    return {"pending_actions": list(set(pending_actions))}
+async def get_pending_actions(
+    action_type: Optional[str] = None,
+    status: Optional[str] = "open",
+    min_age_seconds: Optional[float] = None,
+    max_age_seconds: Optional[float] = None,
+    cursor: Optional[int] = None,
+    limit: int = 50
+):
+    """List pending actions, oldest first, with optional filters and cursor pagination"""
+    actions, next_cursor = pending_action_queue.list_actions(
+        action_type=action_type,
+        status=status,
+        min_age_seconds=min_age_seconds,
+        max_age_seconds=max_age_seconds,
+        cursor=cursor,
+        limit=min(max(limit, 1), 500),
+    )
+    return {"pending_actions": actions, "next_cursor": next_cursor}
+
+@router.post("/pending-actions/claim")
+async def claim_pending_action(claim: ClaimRequest):
+    """Lease a pending action to an owner: a specific one, or the oldest open one"""
+    try:
+        action = pending_action_queue.claim(
+            claim.owner,
+            action_type=claim.action_type,
+            action_id=claim.action_id,
+            lease_seconds=claim.lease_seconds,
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Pending action {claim.action_id} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not action:
+        raise HTTPException(status_code=404, detail="No open pending actions")
+    return action
+
+@router.post("/pending-actions/{action_id}/ack")
+async def ack_pending_action(action_id: int, ack: AckRequest):
+    """Mark a claimed pending action as done"""
+    try:
+        return pending_action_queue.ack(action_id, ack.owner)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Pending action {action_id} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 @router.get("/export")
 async def export_analyses():
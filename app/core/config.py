@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from typing import Optional, Dict, List, ClassVar
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,11 +18,68 @@ class Settings(BaseSettings):
     DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL", "sqlite:///./chatbot.db")
     
     # Knowledge Base Configuration
-    KNOWLEDGE_BASE_DIR: str = "data/knowledge_base"
+    KNOWLEDGE_BASE_DIR: str = "data/Knowledge Base"
     PROMPTS_DIR: str = "data/prompts"
     
     # Token Configuration
     MAX_TOKENS_PER_RESPONSE: int = 800
+
+    # Conversation Capture Configuration
+    CONVERSATION_LOG_PATH: str = "data/logs/conversations.jsonl"
+    CONVERSATION_LOG_BUFFER_SIZE: int = 10000
+    CONVERSATION_LOG_BATCH_SIZE: int = 500
+    CONVERSATION_LOG_FLUSH_INTERVAL: float = 1.0
+
+    # Call Analysis Pipeline Configuration
+    CALL_ANALYSIS_IDLE_TIMEOUT: float = 300.0
+    CALL_ANALYSIS_SWEEP_INTERVAL: float = 5.0
+    CALL_ANALYSIS_BATCH_SIZE: int = 200
+
+    # Admission Control Configuration
+    # Token buckets live in a SQLite file so all workers on a host share them
+    RATE_LIMIT_DB_PATH: str = os.path.join(tempfile.gettempdir(), "barbeque_nation_rate_limits.db")
+    # Longest a check waits for another worker's write lock; past that the request counts as over its limit.
+    # Checks wait in their own thread, so this delays only the waiting request, never the event loop
+    RATE_LIMIT_LOCK_TIMEOUT_MS: float = 50.0
+    # Threads per worker for bucket checks; more would only contend with each other for the file's write lock
+    RATE_LIMIT_CHECK_THREADS: int = 1
+    # Behind a reverse proxy or load balancer, set the header it puts the caller's address in
+    # (e.g. "X-Forwarded-For"); otherwise every caller shares the proxy's client bucket
+    CLIENT_IP_HEADER: str = ""
+    TRUSTED_PROXY_HOPS: int = 1  # proxies of ours that append to that header
+    CLIENT_RATE_LIMIT_PER_SECOND: float = 5.0
+    CLIENT_RATE_LIMIT_BURST: float = 20.0
+    SESSION_RATE_LIMIT_PER_SECOND: float = 2.0
+    SESSION_RATE_LIMIT_BURST: float = 5.0
+    MAX_CONCURRENT_TURNS: int = 64  # per worker
+    MAX_QUEUED_TURNS: int = 256  # per worker
+    QUEUE_TIMEOUT_SECONDS: float = 2.0
+    LATENCY_SLO_MS: float = 500.0
+    LATENCY_WINDOW_SECONDS: float = 10.0
+    OVERLOAD_RETRY_AFTER_SECONDS: int = 1
+
+    # Pending Action Queue Configuration
+    PENDING_ACTION_LEASE_SECONDS: float = 900.0
+    PENDING_ACTION_TTL_SECONDS: float = 7 * 24 * 3600.0
+
+    # Debug Surface Configuration
+    # The /api/debug endpoints are disabled unless an admin key is set
+    ADMIN_API_KEY: str = os.getenv("ADMIN_API_KEY", "")
+    SLOW_REQUEST_THRESHOLD_MS: float = 500.0
+    SLOW_REQUEST_LOG_SIZE: int = 200
+    PROFILER_INTERVAL_MS: float = 5.0
+    PROFILER_MIN_INTERVAL_MS: float = 1.0
+    PROFILER_MAX_SECONDS: float = 60.0
+
+    # Per-session turn serialisation
+    SESSION_LOCK_STRIPES: int = 1024
+    # Responses kept per session for answering retried turns (by client turn_id)
+    TURN_REPLY_CACHE_SIZE: int = 8
+
+    # Response Encoding Configuration
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes
+    GZIP_COMPRESS_LEVEL: int = 5
+    BROTLI_QUALITY: int = 4
     
     # Cities and Locations
     CITIES: ClassVar[Dict[str, List[str]]] = {
@@ -38,6 +96,13 @@ class Settings(BaseSettings):
         ]
     }
 
+    # Table inventory per outlet (seats per table -> number of tables)
+    OUTLET_TABLES: ClassVar[Dict[int, int]] = {2: 10, 4: 12, 6: 6, 8: 3, 12: 2}
+    OUTLET_OPEN_TIME: str = "12:00"
+    OUTLET_CLOSE_TIME: str = "23:00"
+    DINING_DURATION_MINUTES: int = 90
+    AVAILABILITY_DAYS: int = 30
+
     # CORS Settings
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
 
@@ -0,0 +1,253 @@
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Deque, List, Optional, Tuple
+from app.core.config import settings
+
+class AdmissionRejected(Exception):
+    """Raised when a request is rate limited (429) or shed under load (503)"""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+class SharedTokenBuckets:
+    """Token buckets stored in a SQLite file so every worker on the host shares them.
+
+    Each check refills and debits all of a request's buckets in one short
+    write transaction. Rows for buckets that have refilled completely are
+    deleted periodically, since a missing row is read as a full bucket.
+
+    ``take`` blocks, so callers on the event loop run it in a worker thread.
+    Waiting for another worker's write lock is capped at ``lock_timeout``
+    seconds; past that it raises sqlite3.OperationalError ("database is
+    locked") instead of stalling.
+    """
+
+    def __init__(self, path: str, lock_timeout: float = 0.05, cleanup_every: int = 1000):
+        self.path = path
+        self.lock_timeout = lock_timeout
+        self.cleanup_every = cleanup_every
+        # One connection per thread: take() runs on whichever worker thread is free
+        self._local = threading.local()
+        self._checks = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        local = self._local
+        # Connections must not be shared across forked workers
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.lock_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def take(self, limits: List[Tuple[str, float, float]]) -> float:
+        """Take one token from every (key, rate, burst) bucket, all or nothing.
+
+        Returns 0 if the tokens were taken, otherwise the number of seconds
+        until every bucket will have a token again.
+        """
+        conn = self._connection()
+        now = time.time()
+        keys = [key for key, _, _ in limits]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = dict(
+                (key, (tokens, updated))
+                for key, tokens, updated in conn.execute(
+                    f"SELECT key, tokens, updated FROM buckets WHERE key IN ({','.join('?' * len(keys))})", keys
+                )
+            )
+            wait = 0.0
+            refilled = []
+            for key, rate, burst in limits:
+                tokens, updated = rows.get(key, (burst, now))
+                tokens = min(burst, tokens + (now - updated) * rate)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / rate)
+                refilled.append((key, tokens))
+            if not wait:
+                refilled = [(key, tokens - 1) for key, tokens in refilled]
+            conn.executemany(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                [(key, tokens, now) for key, tokens in refilled],
+            )
+            self._checks += 1
+            if self._checks % self.cleanup_every == 0:
+                ttl = max(burst / rate for _, rate, burst in limits)
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - ttl,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+def _is_contention(error: sqlite3.Error) -> bool:
+    """Whether a bucket check failed only because another writer held the lock too long"""
+    return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+class AdmissionController:
+    """Admission control for chat turns.
+
+    A request must take a token from its client's and its session's bucket
+    (429 otherwise), then get one of ``max_concurrent`` slots in this worker.
+    At most ``max_queued`` requests wait for a slot, for at most
+    ``queue_timeout`` seconds; beyond that, or while requests are queueing
+    and the recent p99 latency is over the SLO, new requests are shed with
+    503 instead of adding to everyone's latency.
+
+    The shedding checks are in-memory, so they run first and an overloaded
+    worker rejects without touching the bucket file. Bucket checks run on
+    ``check_threads`` threads of their own, and at most ``max_pending_checks``
+    (by default as many as could then be running or queued) may be waiting
+    for one; past that requests are shed too, so a spike cannot build an
+    unbounded backlog in front of the limiter.
+    """
+
+    def __init__(
+        self,
+        buckets: SharedTokenBuckets,
+        client_rate: float,
+        client_burst: float,
+        session_rate: float,
+        session_burst: float,
+        max_concurrent: int,
+        max_queued: int,
+        queue_timeout: float,
+        latency_slo_ms: float,
+        latency_window: float,
+        retry_after: int,
+        check_threads: int = 1,
+        max_pending_checks: Optional[int] = None,
+    ):
+        self.buckets = buckets
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.latency_slo_ms = latency_slo_ms
+        self.latency_window = latency_window
+        self.retry_after = retry_after
+        self.max_pending_checks = max_pending_checks or max_concurrent + max_queued
+        self.enabled = True
+        self.in_flight = 0
+        self.waiting = 0
+        self.checking = 0
+        self.stats = {
+            "admitted": 0, "rate_limited": 0, "shed": 0,
+            "rate_limit_contended": 0, "rate_limit_unavailable": 0,
+        }
+        self._checks = ThreadPoolExecutor(max_workers=check_threads, thread_name_prefix="rate-limit")
+        self._slots = asyncio.Semaphore(max_concurrent)
+        # (finished_at, latency_ms) for recently admitted requests
+        self._latencies: Deque[Tuple[float, float]] = deque(maxlen=10000)
+        self._p99_ms = 0.0
+        self._p99_computed_at = 0.0
+
+    async def _check_rate_limits(self, client_id: str, session_id: str):
+        if self.checking >= self.max_pending_checks:
+            self._shed()
+        self.checking += 1
+        try:
+            # Off the event loop: a contended bucket file must not stall other turns
+            wait = await asyncio.get_running_loop().run_in_executor(self._checks, self.buckets.take, [
+                (f"client:{client_id}", self.client_rate, self.client_burst),
+                (f"session:{session_id}", self.session_rate, self.session_burst),
+            ])
+        except sqlite3.Error as e:
+            if _is_contention(e):
+                # Contention means a burst is hitting the file: count it against the caller, don't admit
+                self.stats["rate_limit_contended"] += 1
+                wait = self.buckets.lock_timeout
+            else:
+                # The file itself is unusable: fail open rather than reject every request
+                self.stats["rate_limit_unavailable"] += 1
+                return
+        finally:
+            self.checking -= 1
+        if wait:
+            self.stats["rate_limited"] += 1
+            raise AdmissionRejected(429, math.ceil(wait), "Too many requests. Please slow down and try again.")
+
+    def recent_p99_ms(self) -> float:
+        """p99 latency of requests finished within the latency window (recomputed at most every 250ms)"""
+        now = time.monotonic()
+        if now - self._p99_computed_at >= 0.25:
+            while self._latencies and self._latencies[0][0] < now - self.latency_window:
+                self._latencies.popleft()
+            latencies = sorted(latency for _, latency in self._latencies)
+            self._p99_ms = latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+            self._p99_computed_at = now
+        return self._p99_ms
+
+    def _overloaded(self) -> bool:
+        """Whether a request that would have to queue for a slot should be shed now"""
+        return self.waiting >= self.max_queued or self.recent_p99_ms() > self.latency_slo_ms
+
+    def _shed(self):
+        self.stats["shed"] += 1
+        raise AdmissionRejected(503, self.retry_after, "The service is busy. Please try again shortly.")
+
+    @asynccontextmanager
+    async def admit(self, client_id: str, session_id: str):
+        """Hold a slot for one chat turn, or raise AdmissionRejected"""
+        if not self.enabled:
+            yield
+            return
+        # Cheap per-worker checks first, so shedding costs no trip to the bucket file
+        if self._slots.locked() and self._overloaded():
+            self._shed()
+        await self._check_rate_limits(client_id, session_id)
+        started = time.perf_counter()
+        if self._slots.locked():
+            if self._overloaded():
+                self._shed()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._shed()
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+        self.in_flight += 1
+        self.stats["admitted"] += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+            self._latencies.append((time.monotonic(), (time.perf_counter() - started) * 1000))
+
+# Create a singleton instance
+admission_controller = AdmissionController(
+    SharedTokenBuckets(settings.RATE_LIMIT_DB_PATH, lock_timeout=settings.RATE_LIMIT_LOCK_TIMEOUT_MS / 1000),
+    client_rate=settings.CLIENT_RATE_LIMIT_PER_SECOND,
+    client_burst=settings.CLIENT_RATE_LIMIT_BURST,
+    session_rate=settings.SESSION_RATE_LIMIT_PER_SECOND,
+    session_burst=settings.SESSION_RATE_LIMIT_BURST,
+    max_concurrent=settings.MAX_CONCURRENT_TURNS,
+    max_queued=settings.MAX_QUEUED_TURNS,
+    queue_timeout=settings.QUEUE_TIMEOUT_SECONDS,
+    latency_slo_ms=settings.LATENCY_SLO_MS,
+    latency_window=settings.LATENCY_WINDOW_SECONDS,
+    retry_after=settings.OVERLOAD_RETRY_AFTER_SECONDS,
+    check_threads=settings.RATE_LIMIT_CHECK_THREADS,
+)
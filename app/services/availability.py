@@ -0,0 +1,192 @@
+from bisect import bisect_left
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import re
+import numpy as np
+from app.core.config import settings
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+TIME_PATTERN = r"^([01]?\d|2[0-3]):[0-5]\d$"
+_TIME_RE = re.compile(TIME_PATTERN)
+
+def time_to_slot(time_str: str) -> int:
+    """Index of the 15-minute slot containing an HH:MM time; ValueError outside 00:00-23:59"""
+    if not _TIME_RE.match(time_str):
+        raise ValueError(f"Not an HH:MM time between 00:00 and 23:59: {time_str!r}")
+    hours, minutes = time_str.split(":")
+    return (int(hours) * 60 + int(minutes)) // SLOT_MINUTES
+
+def slot_to_time(slot: int) -> str:
+    return f"{slot * SLOT_MINUTES // 60:02d}:{slot * SLOT_MINUTES % 60:02d}"
+
+SLOT_LABELS = np.array([slot_to_time(slot) for slot in range(SLOTS_PER_DAY)], dtype=object)
+
+def _pack(slots: np.ndarray) -> np.ndarray:
+    """Pack a (..., 96) boolean slot array into (..., 2) uint64 bitmaps, slot i -> bit i"""
+    packed = np.packbits(slots, axis=-1, bitorder="little")
+    padding = [(0, 0)] * (packed.ndim - 1) + [(0, 16 - packed.shape[-1])]
+    return np.ascontiguousarray(np.pad(packed, padding)).view("<u8")
+
+@lru_cache(maxsize=1024)
+def _window_mask(start_slot: int, end_slot: int) -> np.ndarray:
+    slots = np.zeros(SLOTS_PER_DAY, dtype=bool)
+    slots[max(start_slot, 0):min(end_slot, SLOTS_PER_DAY)] = True
+    return _pack(slots)
+
+class AvailabilityIndex:
+    """Table availability for every outlet over a rolling window of days.
+
+    Free table counts are kept per outlet, day, table size and 15-minute slot.
+    From them a bitmap is precomputed per outlet, day and table size, marking
+    the slots where a party could *start* a full sitting at a table of that
+    size or larger. A search across a city for a party size and time window is
+    then a bitwise AND of those bitmaps with the window mask for all of the
+    city's outlets at once; bitmaps are rebuilt only when a reservation changes
+    an outlet's day.
+    """
+
+    def __init__(self, tables: Dict[int, int], days: int, open_time: str, close_time: str,
+                 duration_minutes: int, start_date: Optional[date] = None):
+        self.table_sizes = sorted(tables)
+        self.table_counts = np.array([tables[size] for size in self.table_sizes], dtype=np.int16)
+        self.days = days
+        self.duration_slots = -(-duration_minutes // SLOT_MINUTES)
+        self.start_date = start_date or date.today()
+        self.open_slots = np.zeros(SLOTS_PER_DAY, dtype=bool)
+        self.open_slots[time_to_slot(open_time):time_to_slot(close_time)] = True
+
+        self.outlets: List[Tuple[str, str]] = []
+        self._outlet_index: Dict[str, int] = {}
+        self._by_city: Dict[str, np.ndarray] = {}
+        n_sizes = len(self.table_sizes)
+        self.free = np.zeros((0, days, n_sizes, SLOTS_PER_DAY), dtype=np.int16)
+        self.bitmaps = np.zeros((0, days, n_sizes, 2), dtype=np.uint64)
+
+    def add_outlets(self, city: str, names: List[str]):
+        """Register outlets with a full table inventory for every day in the window"""
+        first = len(self.outlets)
+        for offset, name in enumerate(names):
+            self.outlets.append((city.lower(), name))
+            self._outlet_index[name.lower()] = first + offset
+        indexes = [i for i, (outlet_city, _) in enumerate(self.outlets) if outlet_city == city.lower()]
+        self._by_city[city.lower()] = np.array(indexes, dtype=np.intp)
+
+        free = np.broadcast_to(
+            self.table_counts[None, None, :, None],
+            (len(names), self.days, len(self.table_sizes), SLOTS_PER_DAY),
+        ).copy()
+        self.free = np.concatenate([self.free, free])
+        self.bitmaps = np.concatenate([self.bitmaps, self._startable_bitmaps(free)])
+
+    def _startable_bitmaps(self, free: np.ndarray) -> np.ndarray:
+        """Bitmaps of slots where a full sitting can start, per table size or larger"""
+        available = (free > 0) & self.open_slots
+        startable = available.copy()
+        for offset in range(1, self.duration_slots):
+            startable[..., :-offset] &= available[..., offset:]
+            startable[..., SLOTS_PER_DAY - offset:] = False
+        # A party that fits a table also fits any larger one
+        startable = np.logical_or.accumulate(startable[..., ::-1, :], axis=-2)[..., ::-1, :]
+        return _pack(startable)
+
+    def _roll(self):
+        """Advance the window to start today, adding fresh inventory for the new days"""
+        shift = (date.today() - self.start_date).days
+        if shift <= 0:
+            return
+        shift = min(shift, self.days)
+        self.free[:, :self.days - shift] = self.free[:, shift:]
+        self.free[:, self.days - shift:] = self.table_counts[None, None, :, None]
+        self.bitmaps[:, :self.days - shift] = self.bitmaps[:, shift:]
+        self.bitmaps[:, self.days - shift:] = self._startable_bitmaps(self.free[:, self.days - shift:])
+        self.start_date = date.today()
+
+    def _day_index(self, day: date) -> Optional[int]:
+        self._roll()
+        index = (day - self.start_date).days
+        return index if 0 <= index < self.days else None
+
+    def search(self, city: str, day: date, party_size: int, window_start: str, window_end: str,
+               limit: Optional[int] = None) -> List[Dict]:
+        """Outlets in a city with a table for the party starting within [window_start, window_end)"""
+        if party_size < 1:
+            raise ValueError("party_size must be at least 1")
+        day_index = self._day_index(day)
+        size_index = bisect_left(self.table_sizes, party_size)
+        outlets = self._by_city.get(city.lower())
+        if day_index is None or size_index == len(self.table_sizes) or outlets is None:
+            return []
+
+        hits = self.bitmaps[outlets, day_index, size_index] & _window_mask(
+            time_to_slot(window_start), time_to_slot(window_end)
+        )
+        matched = np.flatnonzero(hits.any(axis=1))
+        if limit is not None:
+            matched = matched[:limit]
+        # Decode every matching bitmap at once: row-major nonzero keeps each outlet's slots together and in order
+        slots = np.unpackbits(hits[matched].view(np.uint8), axis=1, bitorder="little")[:, :SLOTS_PER_DAY]
+        rows, columns = np.nonzero(slots)
+        labels = SLOT_LABELS[columns].tolist()
+        ends = np.cumsum(np.bincount(rows, minlength=len(matched))).tolist()
+        starts = [0] + ends[:-1]
+        return [
+            {"outlet": self.outlets[outlets[row]][1], "city": city, "slots": labels[start:end]}
+            for row, start, end in zip(matched.tolist(), starts, ends)
+        ]
+
+    def outlet_slots(self, outlet: str, day: date, party_size: int, window_start: str, window_end: str) -> List[str]:
+        """Slots in [window_start, window_end) where the party could start a sitting at one outlet.
+
+        Raises KeyError for an unknown outlet.
+        """
+        if party_size < 1:
+            raise ValueError("party_size must be at least 1")
+        outlet_index = self._outlet_index[outlet.lower()]
+        day_index = self._day_index(day)
+        size_index = bisect_left(self.table_sizes, party_size)
+        if day_index is None or size_index == len(self.table_sizes):
+            return []
+        hits = self.bitmaps[outlet_index, day_index, size_index] & _window_mask(
+            time_to_slot(window_start), time_to_slot(window_end)
+        )
+        slots = np.unpackbits(hits.view(np.uint8), bitorder="little")[:SLOTS_PER_DAY]
+        return SLOT_LABELS[np.flatnonzero(slots)].tolist()
+
+    def reserve(self, outlet: str, day: date, time_str: str, party_size: int) -> Optional[int]:
+        """Hold the smallest free table that fits the party for a full sitting.
+
+        Returns the table size held, or None if nothing fits. Raises KeyError
+        for an unknown outlet and ValueError for a bad time or party size.
+        """
+        if party_size < 1:
+            raise ValueError("party_size must be at least 1")
+        outlet_index = self._outlet_index[outlet.lower()]
+        day_index = self._day_index(day)
+        start = time_to_slot(time_str)
+        end = start + self.duration_slots
+        if day_index is None or end > SLOTS_PER_DAY or not self.open_slots[start:end].all():
+            return None
+        free = self.free[outlet_index, day_index]
+        for size_index in range(bisect_left(self.table_sizes, party_size), len(self.table_sizes)):
+            if (free[size_index, start:end] > 0).all():
+                free[size_index, start:end] -= 1
+                self.bitmaps[outlet_index, day_index] = self._startable_bitmaps(free)
+                return self.table_sizes[size_index]
+        return None
+
+def _build_index() -> AvailabilityIndex:
+    index = AvailabilityIndex(
+        settings.OUTLET_TABLES,
+        days=settings.AVAILABILITY_DAYS,
+        open_time=settings.OUTLET_OPEN_TIME,
+        close_time=settings.OUTLET_CLOSE_TIME,
+        duration_minutes=settings.DINING_DURATION_MINUTES,
+    )
+    for city, outlets in settings.CITIES.items():
+        index.add_outlets(city, outlets)
+    return index
+
+# Create a singleton instance
+availability_index = _build_index()
@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+from app.services.pending_actions import pending_action_queue
+from app.services.funnel_analytics import funnel_analytics
+
+class CallAnalysis(BaseModel):
+    session_id: str
+    start_time: datetime
+    end_time: datetime
+    duration: float
+    user_satisfaction: Optional[int]
+    intent_fulfilled: bool
+    conversation_flow: List[Dict]
+    error_count: int
+    resolution_status: str
+    pending_actions: Optional[List[str]]
+
+# In-memory storage for call analysis (replace with database in production)
+call_analyses: Dict[str, CallAnalysis] = {}
+
+def _merge(earlier: CallAnalysis, later: CallAnalysis) -> CallAnalysis:
+    """One analysis for a call whose session went idle and then carried on"""
+    intent_fulfilled = earlier.intent_fulfilled or later.intent_fulfilled
+    pending_actions = list(dict.fromkeys((earlier.pending_actions or []) + (later.pending_actions or [])))
+    return CallAnalysis(
+        session_id=later.session_id,
+        start_time=min(earlier.start_time, later.start_time),
+        end_time=max(earlier.end_time, later.end_time),
+        duration=earlier.duration + later.duration,
+        user_satisfaction=later.user_satisfaction if later.user_satisfaction is not None else earlier.user_satisfaction,
+        intent_fulfilled=intent_fulfilled,
+        conversation_flow=earlier.conversation_flow + later.conversation_flow,
+        error_count=earlier.error_count + later.error_count,
+        resolution_status="resolved" if intent_fulfilled else later.resolution_status,
+        pending_actions=pending_actions or None,
+    )
+
+def store_call_analysis(analysis: CallAnalysis, merge: bool = False):
+    """Store a call analysis, whether posted externally or derived from a chat session.
+
+    With ``merge``, an analysis for a session that already has one is
+    treated as a later segment of the same call and folded into it, rather
+    than replacing it.
+    """
+    previous = call_analyses.get(analysis.session_id) if merge else None
+    new_actions = analysis.pending_actions or []
+    if previous is not None:
+        analysis = _merge(previous, analysis)
+        new_actions = [action for action in new_actions if action not in (previous.pending_actions or [])]
+    call_analyses[analysis.session_id] = analysis
+    funnel_analytics.add(analysis)
+    for description in new_actions:
+        pending_action_queue.add(analysis.session_id, description)
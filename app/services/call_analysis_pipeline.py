@@ -0,0 +1,184 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.services.state_manager import ConversationState
+from app.services.call_analysis import CallAnalysis, store_call_analysis
+
+@dataclass
+class SessionStats:
+    """Running totals for one live chat session"""
+    session_id: str
+    start_time: datetime
+    end_time: datetime
+    last_seen: float
+    query_type: Optional[str] = None
+    error_count: int = 0
+    last_turn_failed: bool = False
+    booking_started: bool = False
+    booking_confirmed: bool = False
+    query_answered: bool = False
+    conversation_flow: List[Dict[str, Any]] = field(default_factory=list)
+
+class CallAnalysisPipeline:
+    """Derives a CallAnalysis for every chat session in the background.
+
+    ``observe()`` runs on the request path and only updates running totals for
+    the session. A session is finished when it reaches FAREWELL or has been
+    idle for ``idle_timeout`` seconds; finished sessions are queued and turned
+    into CallAnalysis records in batches by a background task. A session that
+    carries on after being finished is merged into its earlier analysis.
+    """
+
+    def __init__(self, idle_timeout: float, sweep_interval: float, batch_size: int):
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.batch_size = batch_size
+        # Ordered by last activity so the idle sweep only touches expired sessions
+        self.active: "OrderedDict[str, SessionStats]" = OrderedDict()
+        self.analysed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def observe(self, turn: Dict[str, Any]):
+        """Fold one chat turn into the running totals for its session"""
+        if self._queue is None:
+            # Not started (e.g. replay workers); nothing would consume the result
+            return
+        session_id = turn["session_id"]
+        now = datetime.fromisoformat(turn["timestamp"])
+        stats = self.active.get(session_id)
+        if stats is None:
+            stats = SessionStats(session_id=session_id, start_time=now, end_time=now, last_seen=time.monotonic())
+            self.active[session_id] = stats
+        else:
+            stats.end_time = now
+            stats.last_seen = time.monotonic()
+            self.active.move_to_end(session_id)
+
+        state_before = turn.get("state_before")
+        state_after = turn.get("state_after")
+        if turn.get("query_type"):
+            stats.query_type = turn["query_type"]
+        stats.last_turn_failed = turn.get("error") is not None
+        if stats.last_turn_failed:
+            stats.error_count += 1
+        if state_after == ConversationState.BOOKING_COLLECTION:
+            stats.booking_started = True
+        if turn.get("answered"):
+            stats.query_answered = True
+        if state_before == ConversationState.BOOKING_CONFIRMATION and state_after == ConversationState.FAREWELL:
+            stats.booking_confirmed = True
+        stats.conversation_flow.append({
+            "timestamp": turn["timestamp"],
+            "state_before": state_before,
+            "state": state_after,
+            "latency_ms": turn.get("latency_ms"),
+            "error": turn.get("error"),
+        })
+
+        if state_after == ConversationState.FAREWELL:
+            self._finish(session_id)
+
+    def _finish(self, session_id: str):
+        stats = self.active.pop(session_id, None)
+        if stats is not None and self._queue is not None:
+            self._queue.put_nowait(stats)
+
+    def _sweep_idle(self):
+        """Finish every session that has been idle longer than the timeout"""
+        cutoff = time.monotonic() - self.idle_timeout
+        while self.active:
+            session_id, stats = next(iter(self.active.items()))
+            if stats.last_seen > cutoff:
+                break
+            self._finish(session_id)
+
+    def analyse(self, stats: SessionStats) -> CallAnalysis:
+        """Build the CallAnalysis for a finished session"""
+        if stats.query_type == "Booking" or stats.booking_started:
+            intent_fulfilled = stats.booking_confirmed
+        else:
+            intent_fulfilled = stats.query_answered
+
+        if intent_fulfilled:
+            resolution_status = "resolved"
+        elif stats.last_turn_failed:
+            resolution_status = "failed"
+        else:
+            resolution_status = "abandoned"
+
+        pending_actions = []
+        if stats.booking_started and not stats.booking_confirmed:
+            pending_actions.append(f"Follow up on incomplete booking ({stats.session_id})")
+        if stats.error_count:
+            pending_actions.append(f"Review {stats.error_count} error(s) in session {stats.session_id}")
+
+        return CallAnalysis(
+            session_id=stats.session_id,
+            start_time=stats.start_time,
+            end_time=stats.end_time,
+            duration=(stats.end_time - stats.start_time).total_seconds(),
+            user_satisfaction=None,
+            intent_fulfilled=intent_fulfilled,
+            conversation_flow=stats.conversation_flow,
+            error_count=stats.error_count,
+            resolution_status=resolution_status,
+            pending_actions=pending_actions or None,
+        )
+
+    async def _consume(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            for stats in batch:
+                try:
+                    store_call_analysis(self.analyse(stats), merge=True)
+                    self.analysed += 1
+                except Exception as e:
+                    print(f"Error analysing session {stats.session_id}: {e}")
+            # Give chat turns a chance to run between batches
+            await asyncio.sleep(0)
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self._sweep_idle()
+
+    def start(self):
+        """Start the sweep and consumer tasks on the running event loop"""
+        if not self._tasks:
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._consume()), asyncio.create_task(self._sweep())]
+
+    async def stop(self):
+        """Stop the background tasks and analyse everything still queued or active"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        pending = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            self._queue = None
+        pending.extend(self.active.values())
+        self.active.clear()
+        for stats in pending:
+            store_call_analysis(self.analyse(stats), merge=True)
+            self.analysed += 1
+
+# Create a singleton instance
+call_analysis_pipeline = CallAnalysisPipeline(
+    idle_timeout=settings.CALL_ANALYSIS_IDLE_TIMEOUT,
+    sweep_interval=settings.CALL_ANALYSIS_SWEEP_INTERVAL,
+    batch_size=settings.CALL_ANALYSIS_BATCH_SIZE,
+)
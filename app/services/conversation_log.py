@@ -0,0 +1,106 @@
+import asyncio
+import json
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+from app.core.config import settings
+
+class ConversationLog:
+    """Append-only log of chat turns.
+
+    Turns are pushed onto a bounded ring buffer on the request path and written
+    to disk in batches by a background task, so chat turns never wait on I/O.
+    When the buffer is full the oldest unflushed turn is dropped and counted.
+    """
+
+    def __init__(self, path: str, capacity: int, batch_size: int, flush_interval: float):
+        self.path = Path(path)
+        self.buffer: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = True
+        self.dropped = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def record(self, turn: Dict[str, Any]):
+        """Queue a turn for writing (non-blocking)"""
+        if not self.enabled:
+            return
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(turn)
+        if self._wakeup is not None and len(self.buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        """Pop up to one batch of turns off the buffer"""
+        batch = []
+        while self.buffer and len(batch) < self.batch_size:
+            batch.append(self.buffer.popleft())
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        """Append a batch of turns to the log file as JSON lines"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(turn, default=str) + "\n" for turn in batch))
+
+    async def flush(self):
+        """Write everything currently buffered to disk off the event loop"""
+        while self.buffer:
+            await asyncio.to_thread(self._write, self._drain())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing conversation log: {e}")
+
+    def start(self):
+        """Start the background flush task on the running event loop"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and write out whatever is left in the buffer"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+
+def load_conversations(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Read a conversation log and group its turns by session, in recorded order"""
+    conversations: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                turn = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a truncated last line
+                continue
+            conversations.setdefault(turn["session_id"], []).append(turn)
+    return conversations
+
+# Create a singleton instance
+conversation_log = ConversationLog(
+    settings.CONVERSATION_LOG_PATH,
+    capacity=settings.CONVERSATION_LOG_BUFFER_SIZE,
+    batch_size=settings.CONVERSATION_LOG_BATCH_SIZE,
+    flush_interval=settings.CONVERSATION_LOG_FLUSH_INTERVAL,
+)
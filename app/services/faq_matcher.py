@@ -0,0 +1,136 @@
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+class HashedNgramVectorizer:
+    """Character n-gram TF-IDF vectoriser using the hashing trick.
+
+    Runs entirely locally: n-grams are hashed into a fixed number of columns,
+    so no vocabulary has to be stored and unseen words still get a vector.
+    """
+
+    def __init__(self, ngram_range=(3, 5), n_features: int = 2 ** 14):
+        self.ngram_range = ngram_range
+        self.n_features = n_features
+        self.idf = np.ones(n_features, dtype=np.float32)
+
+    def _ngram_counts(self, text: str) -> Dict[int, int]:
+        """Hashed n-gram counts for a text, built per word with boundary padding"""
+        low, high = self.ngram_range
+        n_features = self.n_features
+        return Counter(
+            zlib.crc32(padded[i:i + n].encode()) % n_features
+            for padded in (f" {word} " for word in _WORD.findall(text.lower()))
+            for n in range(low, high + 1)
+            for i in range(max(1, len(padded) - n + 1))
+        )
+
+    def sparse_vector(self, text: str):
+        """Column indices and L2-normalised TF-IDF weights for one text"""
+        counts = self._ngram_counts(text)
+        if not counts:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        columns = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        weights = (1 + np.log(tf)) * self.idf[columns]
+        norm = np.linalg.norm(weights)
+        return columns, weights / norm if norm else weights
+
+    def fit(self, texts: List[str]) -> "HashedNgramVectorizer":
+        """Learn smoothed inverse document frequencies from a corpus"""
+        df = np.zeros(self.n_features, dtype=np.float32)
+        for text in texts:
+            df[list(self._ngram_counts(text))] += 1
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def transform_columns(self, texts: Iterable[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Normalised TF-IDF rows for texts in column-compressed form.
+
+        Returns (indptr, rows, weights): the non-zero entries of column c are
+        rows[indptr[c]:indptr[c + 1]] with weights[indptr[c]:indptr[c + 1]].
+        """
+        vectors = [self.sparse_vector(text) for text in texts]
+        lengths = [len(columns) for columns, _ in vectors]
+        columns = np.concatenate([c for c, _ in vectors] or [np.empty(0, dtype=np.intp)])
+        weights = np.concatenate([w for _, w in vectors] or [np.empty(0, dtype=np.float32)])
+        rows = np.repeat(np.arange(len(vectors), dtype=np.int32), lengths)
+        order = np.argsort(columns, kind="stable")
+        indptr = np.zeros(self.n_features + 1, dtype=np.int32)
+        np.cumsum(np.bincount(columns, minlength=self.n_features), out=indptr[1:])
+        return indptr, rows[order], weights[order]
+
+class FaqMatcher:
+    """Resolves free-text questions to the closest FAQ answer.
+
+    FAQ entries are embedded once when the knowledge base loads and stored
+    column-compressed, so memory grows with the n-grams the FAQs actually
+    use rather than with the hashed feature space. A lookup gathers the
+    entries in the query's columns and sums them per FAQ; ``match_many``
+    does the same for a whole batch in one pass.
+    """
+
+    def __init__(self, faqs: List[Dict[str, str]], min_score: float = 0.2, batch_size: int = 1024):
+        self.faqs = faqs
+        self.min_score = min_score
+        self.batch_size = batch_size
+        # Index the question together with its answer so answer keywords also match
+        corpus = [f"{faq['question']} {faq['answer']}" for faq in faqs]
+        self.vectorizer = HashedNgramVectorizer().fit(corpus)
+        self._indptr, self._rows, self._weights = self.vectorizer.transform_columns(corpus)
+
+    def _scores(self, query_ids: np.ndarray, columns: np.ndarray, weights: np.ndarray, n_queries: int) -> np.ndarray:
+        """(n_queries, n_faqs) cosine scores for queries given as flat (query, column, weight) entries"""
+        starts = self._indptr[columns]
+        counts = self._indptr[columns + 1] - starts
+        # Positions of every stored entry in the queried columns, column by column
+        positions = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        n_faqs = len(self.faqs)
+        keys = self._rows[positions]
+        if n_queries > 1:
+            keys = np.repeat(query_ids, counts) * n_faqs + keys
+        products = self._weights[positions] * np.repeat(weights, counts)
+        return np.bincount(keys, weights=products, minlength=n_queries * n_faqs).reshape(n_queries, n_faqs)
+
+    def _result(self, index: int, score: float) -> Optional[Dict]:
+        if score < self.min_score:
+            return None
+        return {**self.faqs[index], "score": round(float(score), 4)}
+
+    def match(self, question: str) -> Optional[Dict]:
+        """Best FAQ for a question, or None if nothing scores above ``min_score``"""
+        if not self.faqs:
+            return None
+        columns, weights = self.vectorizer.sparse_vector(question)
+        if not len(columns):
+            return None
+        scores = self._scores(np.zeros(len(columns), dtype=np.intp), columns, weights, 1)[0]
+        best = int(np.argmax(scores))
+        return self._result(best, scores[best])
+
+    def match_many(self, questions: List[str]) -> List[Optional[Dict]]:
+        """Best FAQ for each question in a batch, scored together per batch"""
+        if not self.faqs:
+            return [None] * len(questions)
+        results: List[Optional[Dict]] = []
+        for start in range(0, len(questions), self.batch_size):
+            vectors = [self.vectorizer.sparse_vector(q) for q in questions[start:start + self.batch_size]]
+            lengths = [len(columns) for columns, _ in vectors]
+            if not sum(lengths):
+                results.extend([None] * len(vectors))
+                continue
+            query_ids = np.repeat(np.arange(len(vectors)), lengths)
+            columns = np.concatenate([c for c, _ in vectors])
+            weights = np.concatenate([w for _, w in vectors])
+            scores = self._scores(query_ids, columns, weights, len(vectors))
+            best = np.argmax(scores, axis=1)
+            best_scores = scores[np.arange(len(vectors)), best]
+            results.extend(
+                self._result(int(i), s) if length else None
+                for i, s, length in zip(best, best_scores, lengths)
+            )
+        return results
@@ -0,0 +1,230 @@
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.services.state_manager import ConversationState
+
+STATES: List[ConversationState] = list(ConversationState)
+STATE_CODES: Dict[str, int] = {state.value: code for code, state in enumerate(STATES)}
+
+# Paths are compared on their first MAX_PATH_LENGTH distinct steps, packed into one integer
+MAX_PATH_LENGTH = 12
+
+# Turns of superseded flows are dropped once they outnumber live turns and pass this floor
+COMPACT_MIN_DEAD_TURNS = 10000
+
+Snapshot = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return float("nan")
+    return float("nan")
+
+class FunnelAnalytics:
+    """Funnel and path analytics over CallAnalysis conversation flows.
+
+    Each flow is encoded once, when its analysis is stored, into flat typed
+    arrays of (session index, state code, timestamp) turns grouped by
+    session. Queries then run as whole-array NumPy operations over a
+    snapshot of those arrays. A session that is analysed again replaces its
+    earlier flow; the superseded turns stay in the arrays, marked invalid,
+    until they outnumber the live ones and the arrays are compacted.
+    """
+
+    def __init__(self):
+        self._turn_session = array("i")
+        self._turn_state = array("b")
+        self._turn_time = array("d")
+        self._session_start = array("d")
+        self._session_valid = array("b")
+        self._session_turns = array("i")
+        self._session_index: Dict[str, int] = {}
+        self._dead_turns = 0
+
+    def add(self, analysis):
+        """Encode one CallAnalysis's conversation_flow"""
+        states, times = [], []
+        flow = analysis.conversation_flow
+        # Flows derived from chat turns record the state each turn ended in; the state the
+        # first turn started from is only in its state_before, with no time of its own
+        entry_code = STATE_CODES.get(flow[0].get("state_before")) if flow else None
+        if entry_code is not None:
+            states.append(entry_code)
+            times.append(float("nan"))
+        for entry in flow:
+            code = STATE_CODES.get(entry.get("state"))
+            if code is not None:
+                states.append(code)
+                times.append(_timestamp(entry.get("timestamp")))
+        previous = self._session_index.get(analysis.session_id)
+        if previous is not None:
+            self._session_valid[previous] = 0
+            self._dead_turns += self._session_turns[previous]
+        session = len(self._session_start)
+        self._session_index[analysis.session_id] = session
+        self._session_start.append(analysis.start_time.timestamp())
+        self._session_valid.append(1)
+        self._session_turns.append(len(states))
+        self._turn_session.extend([session] * len(states))
+        self._turn_state.extend(states)
+        self._turn_time.extend(times)
+        if self._dead_turns >= COMPACT_MIN_DEAD_TURNS and self._dead_turns * 2 > len(self._turn_state):
+            self._compact()
+
+    def _compact(self):
+        """Drop the turns of superseded flows and renumber the remaining sessions"""
+        valid = np.array(self._session_valid, dtype=bool)
+        turn_session = np.array(self._turn_session, dtype=np.int32)
+        keep = valid[turn_session]
+        renumbered = (np.cumsum(valid) - 1).astype(np.int32)
+        self._turn_session = array("i", renumbered[turn_session[keep]].tobytes())
+        self._turn_state = array("b", np.array(self._turn_state, dtype=np.int8)[keep].tobytes())
+        self._turn_time = array("d", np.array(self._turn_time, dtype=np.float64)[keep].tobytes())
+        self._session_start = array("d", np.array(self._session_start, dtype=np.float64)[valid].tobytes())
+        self._session_turns = array("i", np.array(self._session_turns, dtype=np.int32)[valid].tobytes())
+        self._session_valid = array("b", np.ones(int(valid.sum()), dtype=np.int8).tobytes())
+        # Only live sessions are indexed: a superseded one's id now points at its replacement
+        self._session_index = {session_id: int(renumbered[index]) for session_id, index in self._session_index.items()}
+        self._dead_turns = 0
+
+    def add_encoded(self, session_start: np.ndarray, turn_session: np.ndarray,
+                    turn_state: np.ndarray, turn_time: np.ndarray):
+        """Bulk-load already encoded sessions (e.g. a backfill or a benchmark).
+
+        ``turn_session`` indexes into ``session_start`` and must be grouped by
+        session, with each session's turns in time order.
+        """
+        offset = len(self._session_start)
+        self._session_start.frombytes(np.ascontiguousarray(session_start, dtype=np.float64).tobytes())
+        self._session_valid.frombytes(np.ones(len(session_start), dtype=np.int8).tobytes())
+        self._session_turns.frombytes(
+            np.bincount(np.asarray(turn_session, dtype=np.int64), minlength=len(session_start)).astype(np.int32).tobytes()
+        )
+        self._turn_session.frombytes((np.asarray(turn_session, dtype=np.int32) + offset).tobytes())
+        self._turn_state.frombytes(np.asarray(turn_state, dtype=np.int8).tobytes())
+        self._turn_time.frombytes(np.ascontiguousarray(turn_time, dtype=np.float64).tobytes())
+
+    def snapshot(self) -> Snapshot:
+        """Copy the encoded turns so a query can run off the event loop while ingestion continues"""
+        return (
+            np.array(self._turn_session, dtype=np.int32),
+            np.array(self._turn_state, dtype=np.int8),
+            np.array(self._turn_time, dtype=np.float64),
+            np.array(self._session_start, dtype=np.float64),
+            np.array(self._session_valid, dtype=bool),
+        )
+
+    def compute(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                top_paths: int = 10, snapshot: Optional[Snapshot] = None) -> Dict[str, Any]:
+        """Transition matrix, funnel, dwell times and most common paths for sessions started in a date range"""
+        session, state, ts, session_start, valid = snapshot if snapshot is not None else self.snapshot()
+        if start_date:
+            valid &= session_start >= start_date.timestamp()
+        if end_date:
+            valid &= session_start <= end_date.timestamp()
+        keep = valid[session]
+        session, state, ts = session[keep], state[keep].astype(np.int64), ts[keep]
+
+        n_states = len(STATES)
+        names = [s.value for s in STATES]
+        if not len(state):
+            return {
+                "sessions": 0, "turns": 0, "states": names,
+                "transition_matrix": np.zeros((n_states, n_states), dtype=int).tolist(),
+                "funnel": [], "dwell_seconds": {}, "top_paths": [],
+            }
+
+        same = session[1:] == session[:-1]
+        first = np.ones(len(state), dtype=bool)
+        first[1:] = ~same
+        last = np.ones(len(state), dtype=bool)
+        last[:-1] = ~same
+        n_sessions = int(first.sum())
+
+        transitions = np.bincount(
+            state[:-1][same] * n_states + state[1:][same], minlength=n_states * n_states
+        ).reshape(n_states, n_states)
+
+        reached = np.zeros((len(valid), n_states), dtype=bool)
+        reached[session, state] = True
+        sessions_reached = reached.sum(axis=0)
+        exited_here = np.bincount(state[last], minlength=n_states)
+        funnel = [
+            {
+                "state": names[code],
+                "sessions_reached": int(sessions_reached[code]),
+                "exited_here": int(exited_here[code]),
+                "drop_off_rate": round(float(exited_here[code] / sessions_reached[code]), 4)
+                if sessions_reached[code] and STATES[code] != ConversationState.FAREWELL else 0.0,
+            }
+            for code in range(n_states)
+        ]
+
+        # Dwell: time from the turn that entered a state to the turn that left it, so
+        # consecutive turns in one state count once, as a single stay
+        entered = first.copy()
+        entered[1:] |= state[1:] != state[:-1]
+        stay_session, stay_state, stay_ts = session[entered], state[entered], ts[entered]
+        next_same = stay_session[1:] == stay_session[:-1]
+        dwell = stay_ts[1:][next_same] - stay_ts[:-1][next_same]
+        dwell_state = stay_state[:-1][next_same]
+        usable = np.isfinite(dwell) & (dwell >= 0)
+        dwell, dwell_state = dwell[usable], dwell_state[usable]
+        dwell_seconds = {}
+        for code in range(n_states):
+            samples = dwell[dwell_state == code]
+            if len(samples):
+                median, p90 = np.percentile(samples, [50, 90])
+                dwell_seconds[names[code]] = {
+                    "mean": round(float(samples.mean()), 3),
+                    "median": round(float(median), 3),
+                    "p90": round(float(p90), 3),
+                    "samples": int(len(samples)),
+                }
+
+        return {
+            "sessions": n_sessions,
+            "turns": int(len(state)),
+            "states": names,
+            "transition_matrix": transitions.tolist(),
+            "funnel": funnel,
+            "dwell_seconds": dwell_seconds,
+            "top_paths": self._top_paths(session, state, first, top_paths),
+        }
+
+    def _top_paths(self, session: np.ndarray, state: np.ndarray, first: np.ndarray, limit: int) -> List[Dict]:
+        """Most common state paths, with consecutive repeats of a state collapsed"""
+        n_states = len(STATES)
+        base = n_states + 1  # digit 0 marks the end of a shorter path
+        step = first.copy()
+        step[1:] |= state[1:] != state[:-1]
+        path_state, path_start = state[step], first[step]
+        path_number = np.cumsum(path_start) - 1
+        position = np.arange(len(path_state)) - np.flatnonzero(path_start)[path_number]
+        within = position < MAX_PATH_LENGTH
+        # Exact in float64: base ** MAX_PATH_LENGTH stays far below 2 ** 53
+        codes = np.bincount(
+            path_number[within],
+            weights=(path_state[within] + 1) * np.power(float(base), position[within]),
+        ).astype(np.int64)
+        truncated = np.bincount(path_number, weights=~within, minlength=len(codes)) > 0
+
+        unique_codes, counts = np.unique(codes * 2 + truncated, return_counts=True)
+        top = np.argsort(counts, kind="stable")[::-1][:limit]
+        paths = []
+        for index in top:
+            code, is_truncated = divmod(int(unique_codes[index]), 2)
+            path = []
+            while code:
+                code, digit = divmod(code, base)
+                path.append(STATES[digit - 1].value)
+            paths.append({"path": path, "sessions": int(counts[index]), "truncated": bool(is_truncated)})
+        return paths
+
+# Create a singleton instance
+funnel_analytics = FunnelAnalytics()
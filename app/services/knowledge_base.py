@@ -1,19 +1,45 @@
 import os
-from typing import Dict, List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
 from docx import Document
+import hashlib
 import json
+import uuid
 from pathlib import Path
 from app.core.config import settings
+from app.services.faq_matcher import FaqMatcher
+
+INFO_FIELDS = ("name", "location", "address", "contact", "timings")
+
+@dataclass
+class DocumentVersion:
+    """Content hash of one knowledge base document and the versions that touched it"""
+    hash: str
+    added: int
+    changed: int
+    removed: Optional[int] = None
+
+def _content_hash(content: Any) -> str:
+    return hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:16]
 
 class KnowledgeBase:
     def __init__(self):
-        self.kb_dir = Path("data/Knowledge Base")
+        self.kb_dir = Path(settings.KNOWLEDGE_BASE_DIR)
         # Store restaurant info, menu, and faqs associated with a restaurant key (e.g., "Barbeque Nation - New Delhi")
         self.restaurants: Dict[str, Dict] = {}
+        # FAQ matchers keyed by restaurant key, rebuilt whenever the knowledge base loads
+        self.faq_matchers: Dict[str, FaqMatcher] = {}
+        # Every load gets the next version; documents are each restaurant's info, menu and faqs.
+        # Versions restart at 1 in every process, so they only mean something within a generation
+        self.generation = uuid.uuid4().hex
+        self.version = 0
+        self.documents: Dict[str, DocumentVersion] = {}
         self._load_knowledge_base()
     
     def _load_knowledge_base(self):
         """Load all knowledge base documents (restaurant info, menu, faqs) from DOCX files"""
+        # Build from scratch and swap in, so a reload replaces content instead of appending to it
+        restaurants: Dict[str, Dict] = {}
         for file_path in self.kb_dir.glob("*.docx"):
             try:
                 # Skip duplicate files (those with (1) in the name)
@@ -28,11 +54,11 @@ class KnowledgeBase:
                 if "Barbeque Nation" in filename and ("New Delhi" in filename or "Bangalore" in filename):
                     # This is a main restaurant info file
                     restaurant_key = self._extract_restaurant_key_from_filename(filename)
-                    if restaurant_key and restaurant_key not in self.restaurants:
-                        self.restaurants[restaurant_key] = self._initialize_restaurant_data()
+                    if restaurant_key and restaurant_key not in restaurants:
+                        restaurants[restaurant_key] = self._initialize_restaurant_data()
                     if restaurant_key:
                         # Process general info from this file and update the existing data
-                        self._process_general_info(doc, self.restaurants[restaurant_key])
+                        self._process_general_info(doc, restaurants[restaurant_key])
 
                 elif "Menu" in filename:
                     # This is a menu file, associate with relevant cities
@@ -40,9 +66,9 @@ class KnowledgeBase:
                          if city.lower() in filename.lower() or ("Barbeque Nation" in filename and ("New Delhi" in filename or "Bangalore" in filename) is False):
                             # Associate general menu with all cities if filename is general, or with specific city
                             key = f"Barbeque Nation - {city.capitalize()}"
-                            if key not in self.restaurants:
-                                self.restaurants[key] = self._initialize_restaurant_data()
-                            self._process_menu(doc, self.restaurants[key])
+                            if key not in restaurants:
+                                restaurants[key] = self._initialize_restaurant_data()
+                            self._process_menu(doc, restaurants[key])
                             # If it's a general menu file, apply to all cities and break
                             if "Barbeque Nation" in filename and ("New Delhi" in filename or "Bangalore" in filename) is False:
                                  break # Assume general menu applies to all cities
@@ -53,16 +79,85 @@ class KnowledgeBase:
                         if city.lower() in filename.lower() or ("Barbeque Nation" in filename and ("New Delhi" in filename or "Bangalore" in filename) is False):
                             # Associate general FAQ with all cities if filename is general, or with specific city
                             key = f"Barbeque Nation - {city.capitalize()}"
-                            if key not in self.restaurants:
-                                self.restaurants[key] = self._initialize_restaurant_data()
-                            self._process_faqs(doc, self.restaurants[key])
+                            if key not in restaurants:
+                                restaurants[key] = self._initialize_restaurant_data()
+                            self._process_faqs(doc, restaurants[key])
                             # If it's a general FAQ file, apply to all cities and break
                             if "Barbeque Nation" in filename and ("New Delhi" in filename or "Bangalore" in filename) is False:
                                  break # Assume general FAQ applies to all cities
 
             except Exception as e:
                 print(f"Error loading {file_path}: {str(e)}")
+
+        self.restaurants = restaurants
+        self._build_faq_matchers()
+        self._record_version()
+
+    def _build_faq_matchers(self):
+        """Embed each restaurant's FAQ pairs for question matching"""
+        self.faq_matchers = {
+            key: FaqMatcher(data["faqs"])
+            for key, data in self.restaurants.items()
+            if data["faqs"]
+        }
     
+    def _documents(self) -> Dict[str, Any]:
+        """The syncable documents: each restaurant's info, menu and faqs, keyed <restaurant>/<section>"""
+        documents = {}
+        for key, data in self.restaurants.items():
+            documents[f"{key}/info"] = {field: data[field] for field in INFO_FIELDS}
+            documents[f"{key}/menu"] = data["menu"]
+            documents[f"{key}/faqs"] = data["faqs"]
+        return documents
+
+    def _record_version(self):
+        """Give this load the next version and note which documents it added, changed or removed"""
+        self.version += 1
+        current = {doc_id: _content_hash(content) for doc_id, content in self._documents().items()}
+        for doc_id, digest in current.items():
+            entry = self.documents.get(doc_id)
+            if entry is None or entry.removed is not None:
+                self.documents[doc_id] = DocumentVersion(digest, added=self.version, changed=self.version)
+            elif entry.hash != digest:
+                entry.hash, entry.changed = digest, self.version
+        for doc_id, entry in self.documents.items():
+            if doc_id not in current and entry.removed is None:
+                entry.removed = entry.changed = self.version
+
+    def changes(self, since: int, generation: Optional[str] = None) -> Dict[str, Any]:
+        """Documents added, changed or removed after version ``since``.
+
+        A client that has applied every delta up to ``since`` reaches the
+        current version by applying this one. A ``since`` this instance
+        never issued, or one from another ``generation`` (before a restart,
+        or from another worker), gets every document as added, with
+        ``reset`` set so the client drops what it has first.
+        """
+        reset = not 0 <= since <= self.version or (since > 0 and generation != self.generation)
+        if reset:
+            since = 0
+        documents = self._documents()
+        added, changed, removed = {}, {}, []
+        for doc_id, entry in self.documents.items():
+            if entry.changed <= since:
+                continue
+            if entry.removed is not None:
+                if entry.added <= since:
+                    removed.append(doc_id)
+            elif entry.added > since:
+                added[doc_id] = {"hash": entry.hash, "content": documents[doc_id]}
+            else:
+                changed[doc_id] = {"hash": entry.hash, "content": documents[doc_id]}
+        return {
+            "generation": self.generation,
+            "version": self.version,
+            "since": since,
+            "reset": reset,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+        }
+
     def _initialize_restaurant_data(self) -> Dict:
         """Initialize the dictionary structure for a restaurant"""
         return {
@@ -115,8 +210,9 @@ class KnowledgeBase:
                  break
 
     def _process_faqs(self, doc: Document, data: Dict):
-        """Process FAQ information from a DOCX document"""
+        """Process FAQ information from a DOCX document into question/answer pairs"""
         current_section = None
+        lines = []
         for para in doc.paragraphs:
             text = para.text.strip()
             if not text:
@@ -124,10 +220,32 @@ class KnowledgeBase:
             if "FAQs:" in text:
                 current_section = "faqs"
             elif current_section == "faqs" and text:
-                data["faqs"].append(text)
+                lines.append(text)
             # Stop processing FAQs if a new section header is found (simple approach)
             elif text.endswith(":") and current_section == "faqs":
                  break
+        data["faqs"].extend(self._pair_faqs(lines))
+
+    def _pair_faqs(self, lines: List[str]) -> List[Dict[str, str]]:
+        """Group FAQ paragraphs into pairs: a question line followed by its answer lines"""
+        pairs = []
+        question = None
+        answer: List[str] = []
+        for line in lines:
+            is_question = line.endswith("?") or line[:2].upper() in ("Q:", "Q.")
+            if is_question:
+                if question:
+                    pairs.append({"question": question, "answer": " ".join(answer)})
+                question = line[2:].strip() if line[:2].upper() in ("Q:", "Q.") else line
+                answer = []
+            elif question:
+                answer.append(line[2:].strip() if line[:2].upper() in ("A:", "A.") else line)
+            else:
+                # A statement with no question before it answers itself
+                pairs.append({"question": line, "answer": line})
+        if question:
+            pairs.append({"question": question, "answer": " ".join(answer)})
+        return pairs
 
     def get_restaurant_info(self, restaurant_name: str) -> Optional[Dict]:
         """Get information about a specific restaurant (general info, menu, faqs)"""
@@ -146,10 +264,20 @@ class KnowledgeBase:
         restaurant = self.restaurants.get(restaurant_name)
         return restaurant.get("menu", []) if restaurant else []
     
-    def get_faqs(self, restaurant_name: str) -> List[str]:
-        """Get FAQs for a specific restaurant key"""
+    def get_faqs(self, restaurant_name: str) -> List[Dict[str, str]]:
+        """Get FAQ question/answer pairs for a specific restaurant key"""
         restaurant = self.restaurants.get(restaurant_name)
         return restaurant.get("faqs", []) if restaurant else []
 
+    def search_faq(self, restaurant_name: str, query: str) -> Optional[Dict]:
+        """Find the FAQ pair that best answers a question for a specific restaurant key"""
+        matcher = self.faq_matchers.get(restaurant_name)
+        return matcher.match(query) if matcher else None
+
+    def search_faqs(self, restaurant_name: str, queries: List[str]) -> List[Optional[Dict]]:
+        """Batch version of search_faq, e.g. for scoring a whole transcript"""
+        matcher = self.faq_matchers.get(restaurant_name)
+        return matcher.match_many(queries) if matcher else [None] * len(queries)
+
 # Create a singleton instance
 knowledge_base = KnowledgeBase() 
\ No newline at end of file
@@ -0,0 +1,250 @@
+import heapq
+import time
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from sortedcontainers import SortedList
+from app.core.config import settings
+
+OPEN = "open"
+CLAIMED = "claimed"
+DONE = "done"
+EXPIRED = "expired"
+
+# Keyword -> action type, checked in order
+ACTION_TYPES = [
+    ("booking", "booking_follow_up"),
+    ("call back", "callback"),
+    ("callback", "callback"),
+    ("error", "error_review"),
+]
+
+def classify_action(description: str) -> str:
+    """Derive an action type from its free-text description"""
+    text = description.lower()
+    for keyword, action_type in ACTION_TYPES:
+        if keyword in text:
+            return action_type
+    return "other"
+
+class PendingAction(BaseModel):
+    id: int
+    session_id: str
+    type: str
+    description: str
+    status: str = OPEN
+    owner: Optional[str] = None
+    created_at: datetime
+    claimed_at: Optional[datetime] = None
+    lease_expires_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+class PendingActionQueue:
+    """Work queue of follow-up actions raised by call analyses.
+
+    Ids grow with creation time, so id order is age order. Each (type,
+    status) pair keeps a sorted set of ids that every status change moves
+    an action between; listing by status, age filters (turned into id
+    bounds through the creation timestamps) and cursors are then range
+    queries on one set, and claiming takes the smallest id from the open
+    set. Claims are leases: an action not acked before its lease runs out
+    goes back to open. Open actions older than the TTL expire. Finished
+    actions are dropped from the indexes in batches.
+    """
+
+    ALL = ""  # index key covering every type
+
+    def __init__(self, lease_seconds: float, ttl_seconds: float, compact_after: int = 1024):
+        self.lease_seconds = lease_seconds
+        self.ttl_seconds = ttl_seconds
+        self.compact_after = compact_after
+        self.actions: Dict[int, PendingAction] = {}
+        self._next_id = 1
+        self._last_created = 0.0
+        self._created: Dict[int, float] = {}
+        # (session_id, description) -> id of the live action, to skip re-posted duplicates
+        self._keys: Dict[Tuple[str, str], int] = {}
+        # type -> (ids, creation timestamps), both ascending
+        self._index: Dict[str, Tuple[List[int], List[float]]] = {}
+        # (type, status) -> ids of the actions of that type currently in that status
+        self._by_status: Dict[Tuple[str, str], SortedList] = {}
+        # heap of (lease expiry, id); may hold stale entries
+        self._leases: List[Tuple[float, int]] = []
+        self._lease_expiry: Dict[int, float] = {}
+        self._expire_from = 0
+        self._finished = 0
+
+    def add(self, session_id: str, description: str) -> PendingAction:
+        """Queue an action, or return the live one if it was already queued"""
+        key = (session_id, description)
+        existing = self._keys.get(key)
+        if existing is not None:
+            return self.actions[existing]
+
+        now = max(time.time(), self._last_created)
+        self._last_created = now
+        action = PendingAction(
+            id=self._next_id,
+            session_id=session_id,
+            type=classify_action(description),
+            description=description,
+            created_at=datetime.fromtimestamp(now),
+        )
+        self._next_id += 1
+        self.actions[action.id] = action
+        self._created[action.id] = now
+        self._keys[key] = action.id
+        for index_key in (self.ALL, action.type):
+            ids, created = self._index.setdefault(index_key, ([], []))
+            ids.append(action.id)
+            created.append(now)
+        self._index_status(action)
+        return action
+
+    def _index_status(self, action: PendingAction):
+        for index_key in (self.ALL, action.type):
+            self._by_status.setdefault((index_key, action.status), SortedList()).add(action.id)
+
+    def _set_status(self, action: PendingAction, status: str):
+        """Change an action's status, moving it between the status indexes"""
+        for index_key in (self.ALL, action.type):
+            self._by_status[(index_key, action.status)].remove(action.id)
+        action.status = status
+        self._index_status(action)
+
+    def _finish(self, action: PendingAction, status: str):
+        self._set_status(action, status)
+        action.completed_at = datetime.now()
+        self._keys.pop((action.session_id, action.description), None)
+        self._lease_expiry.pop(action.id, None)
+        self._finished += 1
+
+    def _maintain(self, now: float):
+        """Reopen actions whose lease ran out and expire open actions past the TTL"""
+        while self._leases and self._leases[0][0] <= now:
+            expires, action_id = heapq.heappop(self._leases)
+            action = self.actions.get(action_id)
+            if action is None or action.status != CLAIMED or self._lease_expiry.get(action_id) != expires:
+                continue
+            self._set_status(action, OPEN)
+            action.owner = None
+            action.claimed_at = action.lease_expires_at = None
+            del self._lease_expiry[action_id]
+            if self._created[action_id] < now - self.ttl_seconds:
+                self._finish(action, EXPIRED)
+
+        ids, created = self._index.get(self.ALL, ([], []))
+        cutoff = now - self.ttl_seconds
+        while self._expire_from < len(ids) and created[self._expire_from] < cutoff:
+            action = self.actions[ids[self._expire_from]]
+            if action.status == OPEN:
+                self._finish(action, EXPIRED)
+            self._expire_from += 1
+
+        if self._finished >= self.compact_after and self._finished * 2 >= len(self.actions):
+            self._compact()
+
+    def _compact(self):
+        """Drop finished actions and rebuild the indexes without stale entries"""
+        self.actions = {i: a for i, a in self.actions.items() if a.status in (OPEN, CLAIMED)}
+        self._created = {i: self._created[i] for i in self.actions}
+        self._index = {}
+        self._by_status = {}
+        for action in self.actions.values():
+            for index_key in (self.ALL, action.type):
+                ids, created = self._index.setdefault(index_key, ([], []))
+                ids.append(action.id)
+                created.append(self._created[action.id])
+            self._index_status(action)
+        self._leases = [(expires, i) for i, expires in self._lease_expiry.items()]
+        heapq.heapify(self._leases)
+        self._expire_from = 0
+        self._finished = 0
+
+    def claim(self, owner: str, action_type: Optional[str] = None, action_id: Optional[int] = None,
+              lease_seconds: Optional[float] = None) -> Optional[PendingAction]:
+        """Lease an action to an owner: the given one, or the oldest open one of a type.
+
+        Returns None if no open action is available. Raises KeyError for an
+        unknown id and ValueError if the given action is not open.
+        """
+        now = time.time()
+        self._maintain(now)
+        if action_id is not None:
+            action = self.actions.get(action_id)
+            if action is None:
+                raise KeyError(action_id)
+            if action.status != OPEN:
+                raise ValueError(f"Action {action_id} is {action.status}")
+        else:
+            open_ids = self._by_status.get((action_type or self.ALL, OPEN))
+            if not open_ids:
+                return None
+            action = self.actions[open_ids[0]]
+
+        expires = now + (lease_seconds or self.lease_seconds)
+        self._set_status(action, CLAIMED)
+        action.owner = owner
+        action.claimed_at = datetime.fromtimestamp(now)
+        action.lease_expires_at = datetime.fromtimestamp(expires)
+        self._lease_expiry[action.id] = expires
+        heapq.heappush(self._leases, (expires, action.id))
+        return action
+
+    def ack(self, action_id: int, owner: str) -> PendingAction:
+        """Mark a claimed action done. Raises KeyError or ValueError like claim()"""
+        self._maintain(time.time())
+        action = self.actions.get(action_id)
+        if action is None:
+            raise KeyError(action_id)
+        if action.status != CLAIMED or action.owner != owner:
+            raise ValueError(f"Action {action_id} is not claimed by {owner}")
+        self._finish(action, DONE)
+        return action
+
+    def _id_bounds(self, now: float, min_age_seconds: Optional[float],
+                   max_age_seconds: Optional[float]) -> Tuple[int, int]:
+        """Smallest and largest id created within the age bounds, since ids grow with creation time"""
+        ids, created = self._index.get(self.ALL, ([], []))
+        low, high = 0, self._next_id
+        if max_age_seconds is not None:
+            start = bisect_left(created, now - max_age_seconds)
+            low = ids[start] if start < len(ids) else self._next_id
+        if min_age_seconds is not None:
+            end = bisect_right(created, now - min_age_seconds)
+            high = ids[end - 1] if end else -1
+        return low, high
+
+    def list_actions(self, action_type: Optional[str] = None, status: Optional[str] = OPEN,
+             min_age_seconds: Optional[float] = None, max_age_seconds: Optional[float] = None,
+             cursor: Optional[int] = None, limit: int = 50) -> Tuple[List[PendingAction], Optional[int]]:
+        """A page of actions, oldest first, and the cursor for the next page (None on the last)"""
+        now = time.time()
+        self._maintain(now)
+        if status:
+            low, high = self._id_bounds(now, min_age_seconds, max_age_seconds)
+            if cursor is not None:
+                low = max(low, cursor + 1)
+            ids = self._by_status.get((action_type or self.ALL, status), SortedList())
+            page = [self.actions[i] for i in islice(ids.irange(low, high), limit + 1)]
+            if len(page) > limit:
+                return page[:limit], page[limit - 1].id
+            return page, None
+
+        ids, created = self._index.get(action_type or self.ALL, ([], []))
+        start = bisect_left(created, now - max_age_seconds) if max_age_seconds is not None else 0
+        end = bisect_right(created, now - min_age_seconds) if min_age_seconds is not None else len(ids)
+        if cursor is not None:
+            start = max(start, bisect_right(ids, cursor))
+        page = [self.actions[i] for i in ids[start:min(end, start + limit + 1)]]
+        if len(page) > limit:
+            return page[:limit], page[limit - 1].id
+        return page, None
+
+# Create a singleton instance
+pending_action_queue = PendingActionQueue(
+    lease_seconds=settings.PENDING_ACTION_LEASE_SECONDS,
+    ttl_seconds=settings.PENDING_ACTION_TTL_SECONDS,
+)
@@ -0,0 +1,143 @@
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+@dataclass
+class RequestTiming:
+    """Phase marks for one in-flight request"""
+    started: float
+    marks: List[Tuple[str, float]] = field(default_factory=list)
+
+    def phases(self, finished: float) -> List[Dict[str, Any]]:
+        """Time spent in each phase, in order; whatever follows the last mark is 'response'"""
+        phases, previous = [], self.started
+        for name, at in self.marks + [("response", finished)]:
+            phases.append({"phase": name, "ms": round((at - previous) * 1000, 3)})
+            previous = at
+        return phases
+
+_request_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+def mark(phase: str):
+    """End the named phase of the request being handled; a no-op outside a request"""
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.marks.append((phase, time.perf_counter()))
+
+class SlowRequestLog:
+    """The most recent requests slower than a threshold, with their phase breakdown"""
+
+    def __init__(self, threshold_ms: float, size: int):
+        self.threshold_ms = threshold_ms
+        self.captured = 0
+        self._entries: deque = deque(maxlen=size)
+
+    def observe(self, scope: Dict[str, Any], status: int, timing: RequestTiming, finished: float):
+        duration_ms = (finished - timing.started) * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        self.captured += 1
+        self._entries.append({
+            "timestamp": datetime.now().isoformat(),
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "status": status,
+            "duration_ms": round(duration_ms, 3),
+            "phases": timing.phases(finished),
+        })
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Captured requests, newest first"""
+        entries = list(reversed(self._entries))
+        return entries[:limit] if limit is not None else entries
+
+class RequestTimingMiddleware:
+    """ASGI middleware that times every HTTP request and keeps the slow ones.
+
+    Handlers split their time into phases with ``mark()``; the cost when a
+    request is fast is a context variable set and two clock reads.
+    """
+
+    def __init__(self, app, slow_requests: "SlowRequestLog", exclude_prefix: str = "/api/debug"):
+        self.app = app
+        self.slow_requests = slow_requests
+        self.exclude_prefix = exclude_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_prefix):
+            await self.app(scope, receive, send)
+            return
+        timing = RequestTiming(started=time.perf_counter())
+        token = _request_timing.set(timing)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_timing.reset(token)
+            self.slow_requests.observe(scope, status, timing, time.perf_counter())
+
+class ProfilerBusy(Exception):
+    """A profile is already running"""
+
+class SamplingProfiler:
+    """Samples the stacks of every thread in the process for a fixed time.
+
+    Nothing runs between profiles. While one runs, a background thread wakes
+    every ``interval`` seconds, reads ``sys._current_frames()`` and counts
+    each stack; the result is in collapsed-stack form ("frame;frame;frame
+    count"), ready for flamegraph.pl or speedscope. Only one profile runs at
+    a time.
+    """
+
+    def __init__(self):
+        self._running = threading.Lock()
+
+    def profile(self, seconds: float, interval: float) -> Counter:
+        """Sample for ``seconds``; blocks, so call it from a worker thread"""
+        if not self._running.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            sampler = threading.get_ident()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks: Counter = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != sampler:
+                        stacks[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+                time.sleep(interval)
+            return stacks
+        finally:
+            self._running.release()
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ";".join(reversed(frames))
+
+    @staticmethod
+    def format_collapsed(stacks: Counter) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+# Create singleton instances
+slow_request_log = SlowRequestLog(settings.SLOW_REQUEST_THRESHOLD_MS, settings.SLOW_REQUEST_LOG_SIZE)
+sampling_profiler = SamplingProfiler()
@@ -0,0 +1,122 @@
+"""
+Replay captured conversations through the chat state machine.
+
+Usage:
+    python -m app.services.replay data/logs/conversations.jsonl --workers 4
+
+Each captured session is re-driven turn by turn through ``chat()`` in a pool of
+worker processes. Responses and resulting states are compared against what was
+recorded, which makes the log usable both as a regression check and as
+production-shaped load (use ``--repeat`` to multiply it).
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+from app.services.conversation_log import load_conversations
+
+Conversation = Tuple[str, List[Dict[str, Any]]]
+
+def _init_worker():
+    """Stop workers capturing replayed turns or rate limiting the replay"""
+    from app.services.conversation_log import conversation_log
+    from app.services.admission_control import admission_controller
+    conversation_log.enabled = False
+    admission_controller.enabled = False
+
+async def _replay_conversations(conversations: List[Conversation]) -> Dict[str, Any]:
+    from fastapi import HTTPException
+    from app.api.endpoints.chatbot import chat, sessions, ChatRequest
+
+    turns = 0
+    mismatches = []
+    latencies = []
+    for session_id, recorded_turns in conversations:
+        sessions.pop(session_id, None)
+        for index, turn in enumerate(recorded_turns):
+            request = ChatRequest(
+                message=turn["message"],
+                session_id=session_id,
+                current_state=turn.get("requested_state"),
+            )
+            started = time.perf_counter()
+            try:
+                result = await chat(request)
+                response, error = result.response, None
+            except HTTPException as e:
+                response, error = None, e.detail
+            latencies.append((time.perf_counter() - started) * 1000)
+            turns += 1
+
+            context = sessions.get(session_id)
+            state_after = context.current_state.value if context else None
+            if (response, state_after, error) != (turn.get("response"), turn.get("state_after"), turn.get("error")):
+                mismatches.append({
+                    "session_id": session_id,
+                    "turn": index,
+                    "message": turn["message"],
+                    "expected_state": turn.get("state_after"),
+                    "actual_state": state_after,
+                    "expected_response": turn.get("response"),
+                    "actual_response": response,
+                })
+        sessions.pop(session_id, None)
+    return {"turns": turns, "mismatches": mismatches, "latencies": latencies}
+
+def _replay_chunk(conversations: List[Conversation]) -> Dict[str, Any]:
+    return asyncio.run(_replay_conversations(conversations))
+
+def replay(path: str, workers: int = 4, repeat: int = 1) -> Dict[str, Any]:
+    """Replay every conversation in a capture log and summarise the results"""
+    conversations = list(load_conversations(path).items())
+    if repeat > 1:
+        conversations = [
+            (f"{session_id}#{i}", turns)
+            for i in range(repeat)
+            for session_id, turns in conversations
+        ]
+    chunks = [conversations[i::workers] for i in range(workers) if conversations[i::workers]]
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        results = list(pool.map(_replay_chunk, chunks))
+    elapsed = time.perf_counter() - started
+
+    turns = sum(r["turns"] for r in results)
+    mismatches = [m for r in results for m in r["mismatches"]]
+    latencies = sorted(l for r in results for l in r["latencies"])
+
+    def percentile(p: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 3) if latencies else 0.0
+
+    return {
+        "conversations": len(conversations),
+        "turns": turns,
+        "mismatch_count": len(mismatches),
+        "mismatches": mismatches,
+        "elapsed_seconds": round(elapsed, 3),
+        "turns_per_second": round(turns / elapsed, 1) if elapsed > 0 else 0,
+        "latency_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99)},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured chat conversations")
+    parser.add_argument("log_path", help="Path to a conversation capture log (JSON lines)")
+    parser.add_argument("--workers", type=int, default=4, help="Number of worker processes")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the log this many times (load mode)")
+    parser.add_argument("--show", type=int, default=10, help="Number of mismatches to print")
+    args = parser.parse_args()
+
+    summary = replay(args.log_path, workers=args.workers, repeat=args.repeat)
+    print(f"Replayed {summary['turns']} turns from {summary['conversations']} conversations "
+          f"in {summary['elapsed_seconds']}s ({summary['turns_per_second']} turns/s)")
+    print(f"Latency (ms): {summary['latency_ms']}")
+    print(f"Mismatches: {summary['mismatch_count']}")
+    for mismatch in summary["mismatches"][:args.show]:
+        print(f"- {mismatch['session_id']} turn {mismatch['turn']} ({mismatch['message']!r}): "
+              f"expected {mismatch['expected_state']}, got {mismatch['actual_state']}")
+    raise SystemExit(1 if summary["mismatch_count"] else 0)
+
+if __name__ == "__main__":
+    main()
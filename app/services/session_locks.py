@@ -0,0 +1,59 @@
+import asyncio
+from typing import List
+from app.core.config import settings
+
+class Ticket:
+    """A place in a lock's queue, taken when the ticket is created.
+
+    Work done between taking the ticket and entering it (``async with``)
+    can finish in any order without reordering the holders, since each
+    waits in the lock's FIFO queue from the moment it arrived. ``close()``
+    gives the place up, releasing the lock if the ticket got it but was
+    never entered; call it once the ticket is no longer needed.
+    """
+
+    def __init__(self, lock: asyncio.Lock):
+        self._lock = lock
+        self._acquire = asyncio.ensure_future(lock.acquire())
+        self._released = False
+
+    async def __aenter__(self):
+        await self._acquire
+
+    async def __aexit__(self, *exc_info):
+        self._release()
+
+    def _release(self):
+        if not self._released:
+            self._released = True
+            self._lock.release()
+
+    def close(self):
+        if not self._acquire.done():
+            self._acquire.cancel()
+        elif not self._acquire.cancelled() and self._acquire.exception() is None:
+            # Reached the front of the queue but was never entered (e.g. the request was rejected)
+            self._release()
+
+class StripedLocks:
+    """A fixed pool of asyncio locks shared out by key hash.
+
+    Turns for one session always map to the same lock, so they run one at a
+    time and in arrival order (asyncio locks are FIFO), while other sessions
+    mostly land on other stripes and run in parallel. Memory stays constant
+    no matter how many sessions exist, and no per-session cleanup is needed.
+    """
+
+    def __init__(self, stripes: int):
+        self._locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(stripes)]
+
+    def lock_for(self, key: str) -> asyncio.Lock:
+        """The lock guarding a key"""
+        return self._locks[hash(key) % len(self._locks)]
+
+    def ticket(self, key: str) -> Ticket:
+        """Queue for a key's lock now, to be entered later"""
+        return Ticket(self.lock_for(key))
+
+# Create a singleton instance
+session_locks = StripedLocks(settings.SESSION_LOCK_STRIPES)
@@ -1,8 +1,10 @@
+from collections import OrderedDict
 from enum import Enum
-from typing import Dict, Any, Optional
-from pydantic import BaseModel
+from typing import Dict, Any, Optional, Tuple
+from pydantic import BaseModel, PrivateAttr
 from docx import Document
 from pathlib import Path
+from app.core.config import settings
 
 class ConversationState(str, Enum):
     INITIAL_GREETING = "initial_greeting"
@@ -20,6 +22,43 @@ class StateContext(BaseModel):
     restaurant: Optional[str] = None
     query_type: Optional[str] = None
     booking_details: Optional[Dict[str, Any]] = None
+    # Menus shown and FAQ questions answered so far, for judging whether the caller got what they asked for
+    answers_given: int = 0
+    # Lives and dies with the session; see ReplyCache
+    _replies: "ReplyCache" = PrivateAttr(default_factory=lambda: ReplyCache(settings.TURN_REPLY_CACHE_SIZE))
+
+    @property
+    def replies(self) -> "ReplyCache":
+        """Recent responses by client turn id, for answering retried turns"""
+        return self._replies
+
+class ReplyCache:
+    """The last few responses of a session, keyed by client turn id.
+
+    Bounded to ``max_entries`` with the oldest turn evicted first; the whole
+    cache goes away with its session. Deep copies of a StateContext (turn
+    snapshots) share the cache instead of copying it: it only changes after
+    a turn succeeds, so a rolled-back turn has nothing to undo.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+
+    def get(self, turn_id: str) -> Optional[Tuple[str, Any]]:
+        """The (message, response) recorded for a turn id, if still cached"""
+        return self._entries.get(turn_id)
+
+    def put(self, turn_id: str, message: str, response: Any):
+        self._entries[turn_id] = (message, response)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __deepcopy__(self, memo) -> "ReplyCache":
+        return self
 
 class StateManager:
     def __init__(self):
@@ -1,6 +1,6 @@
 import re
 from typing import Dict, Any, Optional
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 def validate_phone_number(phone: str) -> bool:
     """Validate Indian phone number format"""
@@ -70,6 +70,54 @@ def parse_user_input(input_text: str) -> Dict[str, Any]:
     
     return result
 
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+def parse_availability_request(input_text: str, today: Optional[date] = None) -> Dict[str, Any]:
+    """Parse a spoken availability query such as "a table for 8 on Saturday at 8pm".
+
+    Understands everything parse_user_input does, plus today/tonight/tomorrow,
+    weekday names (the next such day, counting today), 12-hour times like
+    "8pm" or "8:30 pm", and party sizes like "for 8" or "party of 8".
+    Returns 'date' as a date, 'time' as HH:MM and 'guests' as an int, or None.
+    """
+    today = today or date.today()
+    text = input_text.lower()
+    parsed = parse_user_input(text)
+    result = {'date': None, 'time': parsed['time'], 'guests': parsed['guests']}
+
+    if parsed['date'] and validate_date(parsed['date']):
+        result['date'] = datetime.strptime(parsed['date'], '%Y-%m-%d').date()
+    elif re.search(r'\b(?:today|tonight)\b', text):
+        result['date'] = today
+    elif re.search(r'\btomorrow\b', text):
+        result['date'] = today + timedelta(days=1)
+    else:
+        weekday_match = re.search(r'\b(' + '|'.join(WEEKDAYS) + r')\b', text)
+        if weekday_match:
+            ahead = (WEEKDAYS.index(weekday_match.group(1)) - today.weekday()) % 7
+            result['date'] = today + timedelta(days=ahead)
+
+    # parse_user_input only matches HH:MM; also accept "8pm", "8:30 pm" and "20:00" with one hour digit
+    time_match = re.search(r'\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b', text)
+    if time_match:
+        hour, minute = int(time_match.group(1)) % 12, int(time_match.group(2) or 0)
+        if time_match.group(3) == 'pm':
+            hour += 12
+        result['time'] = f"{hour:02d}:{minute:02d}"
+    elif result['time'] is None:
+        time_match = re.search(r'\b(\d{1,2}):(\d{2})\b', text)
+        if time_match:
+            result['time'] = f"{int(time_match.group(1)):02d}:{time_match.group(2)}"
+    if result['time'] and not validate_time(result['time']):
+        result['time'] = None
+
+    if result['guests'] is None:
+        guests_match = re.search(r'\b(?:for|party of|table of)\s+(\d{1,2})\b(?!:|\s*(?:am|pm))', text)
+        if guests_match:
+            result['guests'] = int(guests_match.group(1))
+
+    return result
+
 def calculate_booking_duration(start_time: str, end_time: str) -> float:
     """Calculate duration of booking in hours"""
     try:
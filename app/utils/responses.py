@@ -0,0 +1,72 @@
+import gzip
+import json
+from typing import Any, Set
+from fastapi import Request, Response
+from pydantic import BaseModel
+from app.core.config import settings
+
+# Faster encoders are used when installed; the standard library is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+def _default(obj: Any) -> Any:
+    """Serialise objects the encoders don't handle natively"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+def dumps_json(payload: Any) -> bytes:
+    """Encode a payload as compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _accepted_encodings(request: Request) -> Set[str]:
+    encodings = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0"):
+            encodings.add(name.strip().lower())
+    return encodings
+
+def negotiated_response(request: Request, payload: Any, status_code: int = 200) -> Response:
+    """Encode a payload as MessagePack or JSON per the Accept header, compressing large bodies.
+
+    MessagePack is only offered when ``msgpack`` is installed, and brotli only
+    when ``brotli`` is installed; otherwise JSON and gzip are used.
+    """
+    accept = request.headers.get("accept", "")
+    if msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        body = msgpack.packb(payload, default=_default)
+        media_type = "application/msgpack"
+    else:
+        body = dumps_json(payload)
+        media_type = "application/json"
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if len(body) >= settings.COMPRESSION_MIN_SIZE:
+        encodings = _accepted_encodings(request)
+        if brotli is not None and "br" in encodings:
+            body = brotli.compress(body, quality=settings.BROTLI_QUALITY)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in encodings:
+            body = gzip.compress(body, compresslevel=settings.GZIP_COMPRESS_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
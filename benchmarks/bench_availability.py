@@ -0,0 +1,60 @@
+"""
+Benchmark of cross-outlet availability search.
+
+Usage:
+    python -m benchmarks.bench_availability --outlets 500
+
+Builds an AvailabilityIndex with one city of N outlets (plus a few smaller
+cities) over a 30-day window, books part of the evening inventory, then
+times a +/-1 hour search like the chat flow makes, a whole-day search and a
+single reservation.
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from app.core.config import settings
+from app.services.availability import AvailabilityIndex
+
+def _time(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--outlets", type=int, default=500)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = AvailabilityIndex(settings.OUTLET_TABLES, args.days, settings.OUTLET_OPEN_TIME,
+                              settings.OUTLET_CLOSE_TIME, settings.DINING_DURATION_MINUTES)
+    names = [f"outlet-{i}" for i in range(args.outlets)]
+    index.add_outlets("bangalore", names)
+    for city in range(10):
+        index.add_outlets(f"city-{city}", [f"city-{city}-outlet-{i}" for i in range(50)])
+    print(f"Built {len(index.outlets):,} outlets x {args.days} days in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(7)
+    saturday = date.today() + timedelta(days=(5 - date.today().weekday()) % 7 or 7)
+    for _ in range(args.bookings):
+        index.reserve(rng.choice(names), saturday, rng.choice(["19:00", "19:30", "20:00", "20:30"]), rng.choice([2, 4, 8]))
+
+    cases = [
+        ("search 19:00-21:15", lambda: index.search("bangalore", saturday, 8, "19:00", "21:15")),
+        ("search 19:00-21:15, 5", lambda: index.search("bangalore", saturday, 8, "19:00", "21:15", limit=5)),
+        ("search whole day", lambda: index.search("bangalore", saturday, 8, "12:00", "23:00")),
+        ("reserve", lambda: index.reserve(rng.choice(names), saturday + timedelta(days=1), "13:00", 2)),
+    ]
+    print(f"{'operation':>24} {'us/op':>9} {'outlets':>8}")
+    for name, fn in cases:
+        result = fn()
+        matched = len(result) if isinstance(result, list) else ""
+        print(f"{name:>24} {_time(fn, args.iterations):>9.1f} {matched:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark of conversation funnel analytics on synthetic flows.
+
+Usage:
+    python -m benchmarks.bench_funnel --turns 20000000
+
+Generates sessions as random walks over ConversationState with a fixed
+transition matrix (vectorised across sessions), bulk-loads them into a
+FunnelAnalytics instance and times a full query and a date-filtered one.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from app.services.funnel_analytics import FunnelAnalytics, STATES, STATE_CODES
+
+# Rough shape of real traffic: most callers pick a city and outlet, some drop off at each step
+TRANSITIONS = {
+    "initial_greeting": {"city_selection": 0.95, "initial_greeting": 0.05},
+    "city_selection": {"restaurant_selection": 0.85, "city_selection": 0.15},
+    "restaurant_selection": {"query_type": 0.55, "booking_collection": 0.35, "restaurant_selection": 0.10},
+    "query_type": {"query_type": 0.5, "faq_handling": 0.2, "booking_collection": 0.15, "farewell": 0.15},
+    "faq_handling": {"faq_handling": 0.4, "farewell": 0.6},
+    "booking_collection": {"booking_collection": 0.3, "booking_confirmation": 0.7},
+    "booking_confirmation": {"farewell": 0.8, "booking_collection": 0.2},
+    "farewell": {"farewell": 1.0},
+}
+
+def synthetic_flows(n_turns: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    n_states = len(STATES)
+    matrix = np.zeros((n_states, n_states))
+    for source, targets in TRANSITIONS.items():
+        for target, p in targets.items():
+            matrix[STATE_CODES[source], STATE_CODES[target]] = p
+    cumulative = np.cumsum(matrix, axis=1)
+
+    lengths = rng.integers(2, 16, size=n_turns // 8)
+    lengths = lengths[np.cumsum(lengths) <= n_turns]
+    n_sessions, max_length = len(lengths), int(lengths.max())
+
+    walks = np.empty((n_sessions, max_length), dtype=np.int8)
+    walks[:, 0] = STATE_CODES["initial_greeting"]
+    for step in range(1, max_length):
+        u = rng.random(n_sessions)[:, None]
+        walks[:, step] = (u > cumulative[walks[:, step - 1]]).sum(axis=1)
+    mask = np.arange(max_length) < lengths[:, None]
+
+    turn_state = walks[mask]
+    turn_session = np.repeat(np.arange(n_sessions, dtype=np.int32), lengths)
+    start = datetime(2025, 1, 1).timestamp()
+    session_start = start + rng.random(n_sessions) * 30 * 86400
+    gaps = rng.exponential(20.0, size=len(turn_state))
+    gaps[np.concatenate(([0], np.cumsum(lengths)[:-1]))] = 0
+    # Cumulative gaps, restarted at each session's first turn
+    elapsed = np.cumsum(gaps)
+    elapsed -= np.repeat(elapsed[np.concatenate(([0], np.cumsum(lengths)[:-1]))], lengths)
+    turn_time = np.repeat(session_start, lengths) + elapsed
+    return session_start, turn_session, turn_state, turn_time
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    session_start, turn_session, turn_state, turn_time = synthetic_flows(args.turns)
+    print(f"Generated {len(turn_state):,} turns in {len(session_start):,} sessions "
+          f"({time.perf_counter() - started:.2f}s)")
+
+    analytics = FunnelAnalytics()
+    started = time.perf_counter()
+    analytics.add_encoded(session_start, turn_session, turn_state, turn_time)
+    print(f"Bulk load: {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    result = analytics.compute(top_paths=5)
+    print(f"Full query: {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    analytics.compute(start_date=datetime(2025, 1, 8), end_date=datetime(2025, 1, 8) + timedelta(days=7))
+    print(f"One-week query: {time.perf_counter() - started:.2f}s")
+
+    print("Funnel:")
+    for stage in result["funnel"]:
+        print(f"  {stage['state']:>22} reached={stage['sessions_reached']:>9,} drop-off={stage['drop_off_rate']:.1%}")
+    print("Top paths:")
+    for path in result["top_paths"]:
+        print(f"  {path['sessions']:>9,}  {' > '.join(path['path'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark of per-turn response serialisation cost.
+
+Usage:
+    python -m benchmarks.bench_serialization
+
+"before" is the previous path: options rebuilt per turn, a validated
+ChatResponse, FastAPI's response_model serialisation and its default
+JSONResponse. "after" is the current path: precomputed options, an
+unvalidated ChatResponse and negotiated_response (orjson, msgpack, and
+compression for large bodies when the client accepts it).
+"""
+import asyncio
+import time
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from starlette.requests import Request
+from app.core.config import settings
+from app.api.endpoints.chatbot import ChatResponse, CITY_OPTIONS
+from app.utils.responses import negotiated_response
+
+RESPONSE_FIELD = create_response_field(name="chat_response", type_=ChatResponse)
+SMALL_TEXT = "Please select a city (Delhi or Bangalore):"
+LARGE_TEXT = "Here is the menu:\n" + "\n".join(
+    f"- Item {i}: chargrilled starter with house marinade, served with mint chutney" for i in range(80)
+)
+
+def _request(accept: str = "application/json", accept_encoding: str = "") -> Request:
+    headers = [(b"accept", accept.encode()), (b"accept-encoding", accept_encoding.encode())]
+    return Request({"type": "http", "method": "POST", "path": "/api/chatbot/chat", "headers": headers})
+
+async def before(text: str) -> bytes:
+    options = {"cities": list(settings.CITIES.keys())}
+    result = ChatResponse(response=text, state="city_selection", options=options)
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=result)
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+def after(text: str, request: Request) -> bytes:
+    result = ChatResponse.model_construct(response=text, state="city_selection", options=CITY_OPTIONS)
+    return negotiated_response(request, {
+        "response": result.response,
+        "state": result.state,
+        "options": result.options,
+    }).body
+
+def _time(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+async def _time_async(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def main(iterations: int = 20000):
+    loop = asyncio.new_event_loop()
+    json_request = _request()
+    msgpack_request = _request(accept="application/msgpack")
+    gzip_request = _request(accept_encoding="gzip")
+    br_request = _request(accept_encoding="br, gzip")
+
+    print(f"{'payload':>8} {'path':>22} {'us/turn':>9} {'bytes':>7}")
+    for label, text in (("small", SMALL_TEXT), ("large", LARGE_TEXT)):
+        size = len(loop.run_until_complete(before(text)))
+        cost = loop.run_until_complete(_time_async(lambda: before(text), iterations))
+        print(f"{label:>8} {'before (fastapi json)':>22} {cost:>9.2f} {size:>7}")
+        cases = [
+            ("after (json)", lambda: after(text, json_request)),
+            ("after (msgpack)", lambda: after(text, msgpack_request)),
+            ("after (json+gzip)", lambda: after(text, gzip_request)),
+            ("after (json+br)", lambda: after(text, br_request)),
+        ]
+        for name, fn in cases:
+            size = len(fn())
+            print(f"{label:>8} {name:>22} {_time(fn, iterations):>9.2f} {size:>7}")
+    loop.close()
+
+if __name__ == "__main__":
+    main()
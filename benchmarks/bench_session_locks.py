@@ -0,0 +1,64 @@
+"""
+Contention benchmark for per-session turn serialisation.
+
+Usage:
+    python -m benchmarks.bench_session_locks
+
+Fires bursts of concurrent turns (several per session, like double-submits
+and overlapping voice requests) where each turn reads session state, awaits
+simulated I/O and writes the state back. Compares no locking, one global
+lock and striped locks with different stripe counts, reporting wall time and
+how many turns were lost or applied out of order.
+"""
+import argparse
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from app.services.session_locks import StripedLocks
+
+@asynccontextmanager
+async def _no_lock():
+    yield
+
+async def _run(lock_for, sessions: int, turns_per_session: int, io_seconds: float):
+    state = {f"session-{i}": [] for i in range(sessions)}
+
+    async def turn(session_id: str, seq: int):
+        lock = lock_for(session_id)
+        async with lock:
+            history = list(state[session_id])  # read
+            await asyncio.sleep(io_seconds)  # I/O inside the turn
+            state[session_id] = history + [seq]  # write back
+
+    started = time.perf_counter()
+    # Interleave sessions so every session has several turns in flight at once
+    await asyncio.gather(*(
+        turn(f"session-{i}", seq)
+        for seq in range(turns_per_session)
+        for i in range(sessions)
+    ))
+    elapsed = time.perf_counter() - started
+
+    expected = list(range(turns_per_session))
+    lost = sum(turns_per_session - len(history) for history in state.values())
+    out_of_order = sum(1 for history in state.values() if len(history) == turns_per_session and history != expected)
+    return elapsed, lost, out_of_order
+
+async def main(args):
+    total = args.sessions * args.turns
+    print(f"{args.sessions} sessions x {args.turns} concurrent turns, {args.io_ms}ms I/O per turn")
+    print(f"{'strategy':>16} {'seconds':>8} {'turns/s':>9} {'lost':>6} {'reordered':>9}")
+    strategies = [("no lock", lambda key: _no_lock())]
+    strategies += [("global lock", StripedLocks(1).lock_for)]
+    strategies += [(f"{n} stripes", StripedLocks(n).lock_for) for n in args.stripes]
+    for name, lock_for in strategies:
+        elapsed, lost, out_of_order = await _run(lock_for, args.sessions, args.turns, args.io_ms / 1000)
+        print(f"{name:>16} {elapsed:>8.3f} {total / elapsed:>9.0f} {lost:>6} {out_of_order:>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=4, help="Concurrent turns per session")
+    parser.add_argument("--io-ms", type=float, default=2.0)
+    parser.add_argument("--stripes", type=int, nargs="+", default=[64, 1024, 8192])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,70 @@
+"""
+Check that overlapping chat turns for one session run in arrival order.
+
+Usage:
+    python -m benchmarks.check_turn_order
+
+Sends several concurrent turns per session through the real chat endpoint
+while rate limit checks run on several threads and each takes a random
+extra delay, so admission finishes in a different order from arrival (as it
+does when checks wait on a contended bucket file). Reports how many sessions
+ran their turns out of order and exits non-zero if any did.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from app.api.endpoints import chatbot
+from app.api.endpoints.chatbot import ChatRequest
+from app.services.admission_control import AdmissionController, SharedTokenBuckets
+
+class _JitteryBuckets(SharedTokenBuckets):
+    """Bucket checks that take a random extra delay, so they complete out of order"""
+
+    def __init__(self, path: str, max_delay: float):
+        # Wait out contention rather than reject: this checks ordering, not limits
+        super().__init__(path, lock_timeout=5.0)
+        self.max_delay = max_delay
+
+    def take(self, limits):
+        time.sleep(random.uniform(0, self.max_delay))
+        return super().take(limits)
+
+async def main(args) -> int:
+    chatbot.admission_controller = AdmissionController(
+        _JitteryBuckets(os.path.join(tempfile.mkdtemp(), "rate_limits.db"), args.jitter_ms / 1000),
+        client_rate=1e6, client_burst=1e6,
+        session_rate=1e6, session_burst=1e6,
+        max_concurrent=64, max_queued=100000,
+        queue_timeout=60.0, latency_slo_ms=1e9, latency_window=5.0,
+        retry_after=1, check_threads=args.threads,
+    )
+    ran = {}
+    record_turn = chatbot._record_turn
+
+    async def recording_turn(request: ChatRequest):
+        ran.setdefault(request.session_id, []).append(int(request.message.split()[-1]))
+        return await record_turn(request)
+
+    chatbot._record_turn = recording_turn
+    await asyncio.gather(*(
+        chatbot.chat(ChatRequest(message=f"turn {seq}", session_id=f"order-check-{i}"))
+        for i in range(args.sessions)
+        for seq in range(args.turns)
+    ))
+    expected = list(range(args.turns))
+    reordered = sum(1 for order in ran.values() if order != expected)
+    print(f"{args.sessions} sessions x {args.turns} concurrent turns, up to {args.jitter_ms}ms check jitter "
+          f"on {args.threads} threads: {reordered} sessions ran turns out of order")
+    return 1 if reordered else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=4, help="Concurrent turns per session")
+    parser.add_argument("--jitter-ms", type=float, default=4.0)
+    parser.add_argument("--threads", type=int, default=4, help="Rate limit check threads")
+    sys.exit(asyncio.run(main(parser.parse_args())))
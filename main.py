@@ -1,9 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, PlainTextResponse
-from app.api.endpoints import knowledge_base, chatbot, post_call
+from fastapi.responses import FileResponse, PlainTextResponse, ORJSONResponse
+from app.api.endpoints import knowledge_base, chatbot, post_call, debug
 from app.core.config import settings
+from app.services.conversation_log import conversation_log
+from app.services.call_analysis_pipeline import call_analysis_pipeline
+from app.services.profiling import RequestTimingMiddleware, slow_request_log
 import os
 from fastapi.routing import APIRoute
 from fastapi.routing import Mount
@@ -11,7 +14,8 @@ from fastapi.routing import Mount
 app = FastAPI(
     title="Barbeque Nation Chatbot API",
     description="API for handling Barbeque Nation restaurant enquiries and bookings",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -23,6 +27,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Time every request and keep a breakdown of the slow ones (see /api/debug/slow-requests)
+app.add_middleware(RequestTimingMiddleware, slow_requests=slow_request_log)
+
 # Print current working directory for debugging
 print(f"Current working directory: {os.getcwd()}")
 
@@ -34,6 +41,17 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 app.include_router(knowledge_base.router, prefix="/api/knowledge", tags=["Knowledge Base"])
 app.include_router(chatbot.router, prefix="/api/chatbot", tags=["Chatbot"])
 app.include_router(post_call.router, prefix="/api/post-call", tags=["Post-Call Analysis"])
+app.include_router(debug.router, prefix="/api/debug", tags=["Debug"])
+
+@app.on_event("startup")
+async def start_background_tasks():
+    conversation_log.start()
+    call_analysis_pipeline.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await call_analysis_pipeline.stop()
+    await conversation_log.stop()
 
 # Temporarily serve a plain text response at the root URL "/" to test the route
 @app.get("/")